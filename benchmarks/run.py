@@ -0,0 +1,207 @@
+# egegsignals - Software for processing electrogastroenterography signals.
+
+# Copyright (C) 2013 -- 2018 Aleksandr Popov
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Benchmarks of parameters and hfart functions on signals from
+minutes to 24 hours long. Time and peak memory of every function are
+saved to JSON file which can be compared with results of other
+version.
+
+Run from the root folder of project:
+
+    python benchmarks/run.py -o new.json
+    python benchmarks/run.py -o new.json --compare old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath('.'))
+from egegsignals import __version__  # noqa: E402
+from egegsignals import hfart  # noqa: E402
+from egegsignals import parameters as par  # noqa: E402
+
+
+DURATIONS = [60*10, 60*60, 60*60*6, 60*60*24]
+SAMPLING_PERIOD = 0.1
+CHANNELS = 8
+CHUNK_SIZE = 10000
+
+
+def signal(duration, dt, seed=0):
+    """Return time sequence and test signal with spikes."""
+    rand = np.random.RandomState(seed)
+    t = np.arange(int(duration / dt)) * dt
+    x = np.cos(2 * np.pi * 0.05 * t) + 0.5 * rand.normal(size=len(t))
+    x[rand.randint(0, len(t), len(t) // 3000 + 1)] += 10
+    return t, x
+
+
+def cases(t, x, dt):
+    """Return names and functions of benchmarks for signal."""
+    spectrum = abs(np.fft.fft(x))
+    fs = par.egeg_fs['stomach']
+    nseg = int(60*5 / dt)
+    at, xf = hfart.hfa(t, x)
+    channels = [np.sort(np.random.RandomState(i).choice(t, len(at) + 1))
+                for i in range(CHANNELS)]
+    xs = np.array([np.roll(x, i * 1000) for i in range(CHANNELS)])
+
+    def chunks():
+        return (x[i:i + CHUNK_SIZE] for i in range(0, len(x), CHUNK_SIZE))
+
+    def online_dfic():
+        online = par.OnlineDFIC(fs, dt, nseg, nseg // 10)
+        for chunk in chunks():
+            online.update(chunk)
+        return online.value
+    return [
+        ('parameters.dominant_frequency',
+         lambda: par.dominant_frequency(spectrum, dt, fs)),
+        ('parameters.energy', lambda: par.energy(spectrum, dt, fs)),
+        ('parameters.power', lambda: par.power(spectrum, dt, fs)),
+        ('parameters.rhythmicity', lambda: par.rhythmicity(spectrum, dt, fs)),
+        ('parameters.rhythmicity_norm',
+         lambda: par.rhythmicity_norm(spectrum, dt, fs)),
+        ('parameters.band_parameters',
+         lambda: par.band_parameters(spectrum, dt)),
+        ('parameters.stft', lambda: par.stft(x, dt, nseg, nseg // 10)),
+        ('parameters.dfic', lambda: par.dfic(fs, x, dt, nseg, nseg // 10)),
+        ('parameters.OnlineDFIC', online_dfic),
+        ('parameters.parameters_series',
+         lambda: par.parameters_series(x, dt, nseg, nseg // 10)),
+        ('parameters.welch', lambda: par.welch(x, dt, nseg, nseg // 10)),
+        ('parameters.welch_batch',
+         lambda: par.welch(x, dt, nseg, nseg // 10, batch=64)),
+        ('hfart.three_sigma', lambda: hfart.three_sigma(t, xf)),
+        ('hfart.outliers', lambda: hfart.outliers(t, xf)),
+        ('hfart.hfa_filter', lambda: hfart.hfa_filter(t, x)),
+        ('hfart.hfa', lambda: hfart.hfa(t, x)),
+        ('hfart.hfa_channels', lambda: hfart.hfa_channels(t, xs)),
+        ('hfart.hfa_stream',
+         lambda: list(hfart.hfa_stream(chunks, dt, len(x)))),
+        ('hfart.quality', lambda: hfart.quality(t, at)),
+        ('hfart.longest_fragment', lambda: hfart.longest_fragment(t, at)),
+        ('hfart.quality_curve', lambda: hfart.quality_curve(t, at)),
+        ('hfart.best_fragment', lambda: hfart.best_fragment(t, at, 60*5)),
+        ('hfart.merge_artifacts', lambda: hfart.merge_artifacts(*channels)),
+    ]
+
+
+def measure(func, repeat):
+    """Return the best time and peak memory of function."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def run(durations, dt, repeat, names=None):
+    """Run benchmarks and return results."""
+    results = []
+    for duration in durations:
+        t, x = signal(duration, dt)
+        for name, func in cases(t, x, dt):
+            if names and not any(n in name for n in names):
+                continue
+            elapsed, peak = measure(func, repeat)
+            results.append({
+                'name': name,
+                'duration': duration,
+                'samples': len(x),
+                'time': elapsed,
+                'peak_memory': peak,
+            })
+            print("{:32} {:>8g} s {:>10.4f} s {:>10.1f} MiB".format(
+                name, duration, elapsed, peak / 2**20))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print ratios of times to baseline and return number of
+    regressions."""
+    old = {(r['name'], r['duration']): r for r in baseline['results']}
+    regressions = 0
+    print("\nComparison with version {}:".format(baseline['version']))
+    for res in results:
+        prev = old.get((res['name'], res['duration']))
+        if not prev:
+            continue
+        ratio = res['time'] / prev['time']
+        mem_ratio = res['peak_memory'] / max(prev['peak_memory'], 1)
+        mark = ''
+        if ratio > threshold:
+            mark = 'REGRESSION'
+            regressions += 1
+        print("{:32} {:>8g} s time x{:<8.2f} memory x{:<8.2f} {}".format(
+            res['name'], res['duration'], ratio, mem_ratio, mark))
+    return regressions
+
+
+def main(argv=None):
+    """Run benchmarks from command line."""
+    parser = argparse.ArgumentParser(description="Benchmarks of egegsignals.")
+    parser.add_argument('-o', '--output', default='bench.json',
+                        help="JSON file for results (default: %(default)s)")
+    parser.add_argument('-d', '--durations', type=float, nargs='+',
+                        default=DURATIONS,
+                        help="durations of signals (sec)")
+    parser.add_argument('--dt', type=float, default=SAMPLING_PERIOD,
+                        help="sampling period (default: %(default)s)")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="number of runs, the best time is saved "
+                        "(default: %(default)s)")
+    parser.add_argument('-k', '--names', nargs='+',
+                        help="run only benchmarks containing these names")
+    parser.add_argument('--compare', help="JSON file with results of other "
+                        "version")
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help="ratio of times treated as regression "
+                        "(default: %(default)s)")
+    args = parser.parse_args(argv)
+    results = run(args.durations, args.dt, args.repeat, args.names)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'version': __version__,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'dt': args.dt,
+            'results': results,
+        }, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
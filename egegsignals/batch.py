@@ -0,0 +1,218 @@
+# egegsignals - Software for processing electrogastroenterography signals.
+
+# Copyright (C) 2013 -- 2018 Aleksandr Popov
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Batch processing of directories of recordings. Every recording is
+a .npy file with samples of signal. The results are written to CSV
+file, one row per recording."""
+
+import argparse
+import csv
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from egegsignals import hfart
+from egegsignals import parameters as par
+from egegsignals.profiling import Profiler
+from egegsignals.recordings import load
+
+
+columns = ['recording', 'quality', 'artifacts'] + [
+    '{}_{}'.format(organ, name)
+    for organ in par.organ_names
+    for name in par.parameter_names
+]
+
+
+def process(path, dt):
+    """Return results for one recording.
+
+    Parameters
+    ----------
+    path : str
+        Path to .npy file with samples of signal.
+    dt : float
+        Sampling period.
+
+    Returns
+    -------
+    : dict
+        Values for columns.
+    """
+    t, x = load(path, dt)
+    at, _ = hfart.hfa(t, x)
+    row = {
+        'recording': os.path.basename(path),
+        'quality': hfart.quality(t, at),
+        'artifacts': len(at),
+    }
+    values = par.band_parameters(abs(np.fft.rfft(x)), dt, one_side=True,
+                                 n=len(x))
+    for organ in par.organ_names:
+        for name in par.parameter_names:
+            row['{}_{}'.format(organ, name)] = values[organ][name]
+    return row
+
+
+def _process_safe(path, dt, profile=False):
+    """Return results for one recording or error message and
+    statistics of profiling."""
+    profiler = Profiler()
+    try:
+        if profile:
+            with profiler:
+                return process(path, dt), None, profiler.stats()
+        return process(path, dt), None, None
+    except Exception as exc:  # pylint: disable=broad-except
+        return None, '{}: {}'.format(os.path.basename(path), exc), \
+            profiler.stats()
+
+
+def _process_chunk(paths, dt, profile=False):
+    """Return results for several recordings (see _process_safe)."""
+    return [_process_safe(path, dt, profile) for path in paths]
+
+
+def _repair(output):
+    """Cut the last line of CSV file if it was not written to the
+    end."""
+    with open(output, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+def processed(output):
+    """Return names of recordings which already have results.
+
+    Parameters
+    ----------
+    output : str
+        Path to CSV file with results.
+
+    Returns
+    -------
+    : set
+        Names of recordings. The header and incomplete rows are
+        skipped.
+    """
+    if not os.path.exists(output):
+        return set()
+    with open(output, newline='') as f:
+        return {row[0] for row in csv.reader(f)
+                if len(row) == len(columns) and row != columns}
+
+
+def run(directory, output, dt, workers=None, chunksize=1, pattern='*.npy',
+        profile=None):
+    """Process all recordings in directory and write results to CSV
+    file. The rows are written as soon as recordings are processed.
+    Recordings which already have results in the file are skipped, so
+    interrupted run can be resumed. Recordings which failed are
+    reported to stderr and are not written.
+
+    Parameters
+    ----------
+    directory : str
+        Directory with recordings.
+    output : str
+        Path to CSV file with results.
+    dt : float
+        Sampling period.
+    workers : int
+        Number of processes. If None, it is the number of processors.
+    chunksize : int
+        Number of recordings sent to a process at once.
+    pattern : str
+        Pattern of names of recordings.
+    profile : str
+        Path to JSON file for statistics of profiling of stages
+        aggregated over all recordings. If None, profiling is
+        disabled.
+
+    Returns
+    -------
+    : int
+        Number of recordings processed.
+    """
+    if os.path.exists(output):
+        _repair(output)
+    done = processed(output)
+    paths = [path for path in sorted(glob.glob(os.path.join(directory,
+                                                            pattern)))
+             if os.path.basename(path) not in done]
+    new = not os.path.exists(output) or os.path.getsize(output) == 0
+    count = 0
+    profiler = Profiler()
+    with open(output, 'a', newline='') as f, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        if new:
+            writer.writeheader()
+            f.flush()
+        futures = [executor.submit(_process_chunk, paths[i:i + chunksize],
+                                   dt, bool(profile))
+                   for i in range(0, len(paths), chunksize)]
+        for future in as_completed(futures):
+            for row, error, stats in future.result():
+                if stats:
+                    profiler.update(stats)
+                if error:
+                    print(error, file=sys.stderr)
+                    continue
+                writer.writerow(row)
+                count += 1
+            f.flush()
+    if profile:
+        profiler.to_json(profile)
+    return count
+
+
+def main(argv=None):
+    """Entry point of console script."""
+    parser = argparse.ArgumentParser(
+        description="Calculate quality and parameters of EGG/EGEG "
+        "recordings in directory.")
+    parser.add_argument('directory', help="directory with .npy recordings")
+    parser.add_argument('-o', '--output', default='results.csv',
+                        help="CSV file with results (default: %(default)s)")
+    parser.add_argument('--dt', type=float, required=True,
+                        help="sampling period (sec)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="number of processes (default: number of "
+                        "processors)")
+    parser.add_argument('--chunksize', type=int, default=1,
+                        help="recordings sent to a process at once "
+                        "(default: %(default)s)")
+    parser.add_argument('--pattern', default='*.npy',
+                        help="pattern of names of recordings "
+                        "(default: %(default)s)")
+    parser.add_argument('--profile', default=None,
+                        help="JSON file for time of stages of processing")
+    args = parser.parse_args(argv)
+    count = run(args.directory, args.output, args.dt, args.workers,
+                args.chunksize, args.pattern, args.profile)
+    print("{} recordings processed".format(count))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
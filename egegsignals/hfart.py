@@ -21,21 +21,125 @@ signals for detection of short artifacts and quantitative assessment
 of the quality of signals.
 
 The initial version of this module was written with Anastasia Kuzmina
-in 2014."""
+in 2014.
+
+scipy.signal is imported on first filtration, so importing the module
+is fast."""
+
+from functools import lru_cache
 
 import numpy as np
-from scipy.signal import hanning, firwin
 
+from egegsignals.profiling import profiled
+from egegsignals.recordings import TimeAxis
+
+
+def _sigma_bounds(t_last, aver, step):
+    """
+    Calculates bounds of averaging and filling intervals for
+    three_sigma. The bounds are accumulated the same way as the step
+    by step loop does it.
+
+    :returns: tuple of bounds of averaging intervals and filling
+              intervals, the last items are for the tail of signal
+
+    """
+    lim = t_last + step
+    num = max(int((lim - aver) / step), -1) + 3
+    steps = np.full(num, step, dtype=float)
+    steps[0] = aver
+    ecalc = np.add.accumulate(steps)
+    num = np.count_nonzero(ecalc <= lim)
+    steps = np.full(num + 1, step, dtype=float)
+    steps[0] = 0
+    bcalc = np.add.accumulate(steps)
+    steps[0] = aver/2
+    efill = np.add.accumulate(steps[:num])
+    bfill = np.concatenate(([0], efill))
+    return bcalc, ecalc[:num], bfill, efill
+
+
+def _sigma_indices(t, aver, step):
+    """
+    Finds indices of bounds of averaging and filling intervals for
+    three_sigma in time sequence
+
+    :returns: tuple of indices of starts and stops of averaging
+              intervals and of starts of filling intervals, the last
+              items are for the tail of signal and the stop of the
+              last filling interval is the length of signal
+
+    """
+    bcalc, ecalc, bfill, _ = _sigma_bounds(t[-1], aver, step)
+    ibcalc = t.searchsorted(bcalc, side='left')
+    iecalc = np.concatenate((t.searchsorted(ecalc, side='left'), [len(t)]))
+    ifill = np.concatenate((t.searchsorted(bfill, side='left'), [len(t)]))
+    return ibcalc, iecalc, ifill
+
+
+# number of samples processed at once by three_sigma, it bounds the
+# size of temporary arrays
+BLOCK_SIZE = 2**16
+
+
+def _cumsums(x, m, bounds):
+    """
+    Calculates cumulative sums of centered samples and squared
+    centered samples at bounds. The signal is processed by blocks, so
+    the temporary arrays do not depend on its length, and the sums are
+    accumulated in float64 whatever the type of samples is
 
-def three_sigma(t, x, aver=60*10, step=30):
+    """
+    n = x.shape[-1]
+    points = np.union1d(bounds, [0, n])
+    sums = np.zeros(x.shape[:-1] + (2, len(points) - 1))
+    for start in range(0, n, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, n)
+        lo = points.searchsorted(start, side='right') - 1
+        hi = points.searchsorted(stop, side='left')
+        local = np.maximum(points[lo:hi], start) - start
+        xc = x[..., start:stop] - m
+        sums[..., 0, lo:hi] += np.add.reduceat(xc, local, axis=-1,
+                                               dtype=np.float64)
+        xc *= xc
+        sums[..., 1, lo:hi] += np.add.reduceat(xc, local, axis=-1,
+                                               dtype=np.float64)
+    zeros = np.zeros(sums.shape[:-1] + (1,))
+    csums = np.concatenate((zeros, np.cumsum(sums, axis=-1)), axis=-1)
+    csums = csums[..., points.searchsorted(bounds)]
+    return csums[..., 0, :], csums[..., 1, :]
+
+
+def _sigma(csum_b, csum_e, csum2_b, csum2_e, num):
+    """
+    Calculates 3 * sigma from cumulative sums of samples and squared
+    samples at bounds of intervals
+
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = (csum_e - csum_b) / num
+        var = (csum2_e - csum2_b) / num - mean**2
+    return 3 * np.sqrt(np.maximum(var, 0))
+
+
+@profiled('x')
+def three_sigma(t, x, aver=60*10, step=30, dtype=None):
     """
     Calculates the 3 * sigma zone (normal distribution) with averaging
     on intervals.
 
+    The bounds of intervals are found on the sorted time sequence and
+    the standard deviations are calculated using cumulative sums, so
+    the complexity is linear in the length of signal. The sums are
+    accumulated in float64 for any type of samples. The signal is
+    processed by blocks of BLOCK_SIZE samples, so besides the result
+    only temporary arrays of the block size are allocated.
+
     :param t: Time sequence (sec)
     :type t: numpy.ndarray
 
-    :param x: Sample sequence
+    :param x: Sample sequence or sequences of several channels
+              (channels, samples)
     :type x: numpy.ndarray
 
     :param aver: Length of averaging interval (sec)
@@ -44,57 +148,141 @@ def three_sigma(t, x, aver=60*10, step=30):
     :param step: Step (sec)
     :type step: float
 
+    :param dtype: Type of samples and result, for example
+                  numpy.float32. If None, it is float64
+    :type dtype: numpy.dtype
+
     :returns: numpy.ndarray
 
     """
-    s = x.copy()
-    bcalc = 0
-    ecalc = aver
-    bfill = 0
-    efill = aver/2
-    while ecalc <= t[-1] + step:
-        ind_s = (t >= bfill) & (t < efill)
-        ind_x = (t >= bcalc) & (t < ecalc)
-        s[ind_s] = 3 * np.std(x[ind_x])
-        bcalc += step
-        ecalc += step
-        bfill = efill
-        efill += step
-    s[t >= bfill] = 3 * np.std(x[t >= bcalc])
+    ibcalc, iecalc, ifill = _sigma_indices(t, aver, step)
+    x = np.asarray(x, dtype=dtype)
+    dtype = np.dtype(dtype or float)
+    m = np.mean(x, axis=-1, keepdims=True, dtype=np.float64)
+    csum, csum2 = _cumsums(x, m.astype(dtype),
+                           np.concatenate((ibcalc, iecalc)))
+    nb = len(ibcalc)
+    sigma = _sigma(csum[..., :nb], csum[..., nb:], csum2[..., :nb],
+                   csum2[..., nb:], iecalc - ibcalc)
+    s = np.empty(x.shape, dtype=dtype)
+    s[..., :ifill[0]] = x[..., :ifill[0]]
+    for start in range(ifill[0], x.shape[-1], BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, x.shape[-1])
+        ind = ifill.searchsorted(np.arange(start, stop), side='right') - 1
+        s[..., start:stop] = sigma[..., ind]
     return s
 
 
-def outliers(t, x):
+@profiled('x')
+def outliers(t, x, return_indices=False, dtype=None):
     """
     Finds outliers
 
     :param t: Time sequence (sec)
     :type t: numpy.ndarray
 
-    :param x: Sample sequence
+    :param x: Sample sequence or sequences of several channels
+              (channels, samples)
     :type x: numpy.ndarray
 
-    :returns: numpy.ndarray
+    :param return_indices: If True, indices of outliers are returned too
+    :type return_indices: bool
+
+    :param dtype: Type of samples used in calculations (see three_sigma)
+    :type dtype: numpy.dtype
+
+    :returns: numpy.ndarray or tuple of times and indices of outliers,
+              for several channels lists of them
 
     """
-    m = np.mean(x)
-    s = three_sigma(t, x)
-    ot = []
-    for ti, xi, si in zip(t, x, s):
-        if (xi < m - si) | (xi > m + si):
-            ot.append(ti)
-    ot = np.array(ot)
+    x = np.asarray(x, dtype=dtype)
+    s = three_sigma(t, x, dtype=dtype)
+    m = np.mean(x, axis=-1, keepdims=True, dtype=np.float64).astype(s.dtype)
+    mask = (x < m - s) | (x > m + s)
+    if x.ndim == 1:
+        ind = np.flatnonzero(mask)
+        ot = t[ind]
+    else:
+        ind = [np.flatnonzero(mask_i) for mask_i in mask]
+        ot = [t[ind_i] for ind_i in ind]
+    if return_indices:
+        return ot, ind
     return ot
 
 
-def hfa_filter(t, x, l=60, cutoff=0.3):
+@lru_cache(maxsize=32)
+def _taper(l, dt):
+    """
+    Returns read-only Hann window tapering l seconds at both ends of
+    signal
+
+    """
+    from scipy.signal.windows import hann
+    h = hann(int(round(2*l/dt)))
+    h.setflags(write=False)
+    return h
+
+
+@lru_cache(maxsize=32)
+def _taps(l, cutoff, dt):
+    """
+    Returns read-only taps of FIR filter for HFA
+
+    """
+    from scipy.signal import firwin
+    taps = firwin(int(round(l/dt)) + 1, cutoff, pass_zero=False, fs=1/dt)
+    taps.setflags(write=False)
+    return taps
+
+
+def _conv_method(n, ntaps):
+    """
+    Chooses the method of convolution by lengths of signal and filter
+
+    """
+    if ntaps <= 32 or n < 2*ntaps:
+        return 'direct'
+    if n > 8*ntaps:
+        return 'overlap-add'
+    return 'fft'
+
+
+def _convolve(x, taps, mode, method='auto'):
+    """
+    Convolves signal or signals of several channels with taps using
+    given method
+
+    """
+    if method == 'auto':
+        method = _conv_method(np.shape(x)[-1], len(taps))
+    if method == 'direct':
+        if np.ndim(x) > 1:
+            return np.array([np.convolve(x_i, taps, mode=mode) for x_i in x])
+        return np.convolve(x, taps, mode=mode)
+    taps = np.reshape(taps, (1,) * (np.ndim(x) - 1) + (-1,))
+    if method == 'fft':
+        from scipy.signal import fftconvolve
+        return fftconvolve(x, taps, mode=mode, axes=-1)
+    if method == 'overlap-add':
+        from scipy.signal import oaconvolve
+        return oaconvolve(x, taps, mode=mode, axes=-1)
+    raise ValueError("unknown method of convolution: {}".format(method))
+
+
+@profiled('x')
+def hfa_filter(t, x, l=60, cutoff=0.3, method='auto', dtype=None):
     """
     Filtrates signal for HFA using FIR filter
 
+    Both ends of signal are tapered with Hann window before
+    filtering. The signal itself is not changed. The taps of filter
+    are cached by (l, cutoff, dt).
+
     :param t: Time sequence (sec)
     :type t: numpy.ndarray
 
-    :param x: Sample sequence
+    :param x: Sample sequence or sequences of several channels
+              (channels, samples)
     :type x: numpy.ndarray
 
     :param l: Length of operator
@@ -103,19 +291,57 @@ def hfa_filter(t, x, l=60, cutoff=0.3):
     :param cutoff: Bound (Hz)
     :type cutoff: float
 
-    :returns: numpy.ndarray
+    :param method: Method of convolution: 'direct', 'fft',
+                   'overlap-add' or 'auto' for choosing it by the
+                   lengths of signal and filter
+    :type method: str
+
+    :param dtype: Type of filtered signal, for example numpy.float32
+                  to keep memory for long recordings. Then the taps
+                  are rounded to float32 too and the relative error of
+                  filtered signal is about 1e-6. If None, it is
+                  float64
+    :type dtype: numpy.dtype
+
+    :returns: tuple
 
     """
     dt = t[1] - t[0]
-    h = hanning(2*l/dt)
-    x[t < l] *= h[0:len(h)/2]
-    x[t > (t[-1]-l)] *= h[len(h)/2:]
-    taps = firwin(l/dt+1, cutoff, pass_zero=False, nyq=1/dt/2)
-    xf = np.convolve(x, taps, mode='same')
+    h = _taper(l, dt)
+    taps = _taps(l, cutoff, dt)
+    x = np.asarray(x, dtype=dtype)
+    if dtype:
+        h = h.astype(dtype)
+        taps = taps.astype(dtype)
+    nh = len(h)//2
+    n = x.shape[-1]
+    shift = (len(taps) - 1)//2
+    if n < len(h):
+        # the tapered ends overlap, signal shorter than l seconds is
+        # tapered by parts of both halves of window
+        xt = np.array(x, dtype=dtype or float)
+        xt[..., :min(n, nh)] *= h[:min(n, nh)]
+        start = max(n - (len(h) - nh), 0)
+        xt[..., start:] *= h[len(h) - (n - start):]
+        xf = _convolve(xt, taps, 'full', method)
+        return (t, xf[..., shift:shift + n])
+    # filtering is linear, so the taper is applied as corrections of
+    # the filtered signal near the ends
+    xf = _convolve(x, taps, 'same', method)
+    head = _convolve(x[..., :nh] * (h[:nh] - 1), taps, 'full', 'direct')
+    head = head[..., shift:shift + n]
+    xf[..., :head.shape[-1]] += head
+    tail = _convolve(x[..., n - (len(h) - nh):] * (h[nh:] - 1), taps,
+                     'full', 'direct')
+    start = n - (len(h) - nh) - shift
+    tail = tail[..., max(-start, 0):n - start]
+    start = max(start, 0)
+    xf[..., start:start + tail.shape[-1]] += tail
     return (t, xf)
 
 
-def hfa(t, x):
+@profiled('x')
+def hfa(t, x, dtype=None):
     """
     HFA procedure
 
@@ -125,14 +351,192 @@ def hfa(t, x):
     :param x: Sample sequence
     :type x: numpy.ndarray
 
+    :param dtype: Type of samples used in calculations (see hfa_filter)
+    :type dtype: numpy.dtype
+
     :returns: tuple
 
     """
-    t, xf = hfa_filter(t, x)
-    at = outliers(t, xf)
+    t, xf = hfa_filter(t, x, dtype=dtype)
+    at = outliers(t, xf, dtype=dtype)
     return at, xf
 
 
+@profiled('x')
+def hfa_channels(t, x, tol=0, dtype=None):
+    """
+    HFA procedure for several channels with common time sequence
+
+    :param t: Time sequence (sec)
+    :type t: numpy.ndarray
+
+    :param x: Sample sequences (channels, samples)
+    :type x: numpy.ndarray
+
+    :param tol: Tolerance for merging artifacts of channels (see
+                merge_artifacts)
+    :type tol: float
+
+    :param dtype: Type of samples used in calculations (see hfa_filter)
+    :type dtype: numpy.dtype
+
+    :returns: tuple of list of artifacts of channels, merged artifacts
+              and filtered signals
+
+    """
+    t, xf = hfa_filter(t, x, dtype=dtype)
+    ats = outliers(t, xf, dtype=dtype)
+    return ats, merge_artifacts(*ats, tol=tol), xf
+
+
+def _filter_stream(chunks, dt, n, l=60, cutoff=0.3, method='auto'):
+    """
+    Filtrates signal coming by chunks for HFA, yields filtered chunks
+
+    """
+    h = _taper(l, dt)
+    taps = _taps(l, cutoff, dt)
+    nh = len(h)//2
+    tail_start = n - (len(h) - nh)
+    prev = np.zeros(len(taps) - 1)
+    skip = (len(taps) - 1)//2
+    pos = 0
+    left = n
+    for x in chunks:
+        if not len(x):
+            continue
+        x = np.array(x, dtype=float)
+        stop = pos + len(x)
+        if pos < nh:
+            x[:nh - pos] *= h[pos:min(stop, nh)]
+        if stop > tail_start:
+            start = max(pos, tail_start)
+            x[start - pos:] *= h[nh + start - tail_start:
+                                 nh + stop - tail_start]
+        xp = np.concatenate((prev, x))
+        xf = _convolve(xp, taps, 'valid', method)
+        prev = xp[len(xp) - len(prev):]
+        pos = stop
+        drop = min(skip, len(xf))
+        skip -= drop
+        xf = xf[drop:left + drop]
+        left -= len(xf)
+        yield xf
+    if pos != n:
+        raise ValueError("number of samples is {}, not {}".format(pos, n))
+    xf = _convolve(np.concatenate((prev, np.zeros(len(prev)))), taps,
+                   'valid', method)
+    yield xf[skip:skip + left]
+
+
+def hfa_stream(chunks, dt, n, t0=0, mean=None, l=60, cutoff=0.3,
+               method='auto'):
+    """
+    HFA procedure for signal coming by chunks
+
+    The filter state and the samples of current averaging interval
+    are carried between chunks, so the memory does not depend on the
+    length of signal. The outliers are found with the mean of the
+    whole filtered signal as hfa does. If it is not given, it is
+    calculated by the first pass over the chunks. The results are the
+    same as of hfa for the time sequence t0 + dt * numpy.arange(n).
+
+    :param chunks: Function returning iterator over chunks of sample
+                   sequence, it is called twice if mean is not given
+    :type chunks: callable
+
+    :param dt: Sampling period (sec)
+    :type dt: float
+
+    :param n: Number of samples
+    :type n: int
+
+    :param t0: Time of the first sample (sec)
+    :type t0: float
+
+    :param mean: Mean of filtered signal
+    :type mean: float
+
+    :param l: Length of operator
+    :type l: float (sec)
+
+    :param cutoff: Bound (Hz)
+    :type cutoff: float
+
+    :param method: Method of convolution (see hfa_filter)
+    :type method: str
+
+    :returns: generator of numpy.ndarray of times of artifacts found
+              in the next part of signal
+
+    """
+    if mean is None:
+        mean = sum(np.sum(xf) for xf in
+                   _filter_stream(chunks(), dt, n, l, cutoff, method)) / n
+    t = TimeAxis(t0, dt, n)
+    ibcalc, iecalc, ifill = _sigma_indices(t, aver=60*10, step=30)
+    bounds = np.union1d(ibcalc, iecalc)
+    csums = np.zeros(len(bounds))
+    csums2 = np.zeros(len(bounds))
+    csum = np.zeros(1)
+    csum2 = np.zeros(1)
+    pending = np.zeros(0)
+    first = 0
+    pos = 0
+    for xf in _filter_stream(chunks(), dt, n, l, cutoff, method):
+        xc = xf - mean
+        csum = np.cumsum(np.concatenate((csum[-1:], xc)))
+        csum2 = np.cumsum(np.concatenate((csum2[-1:], xc * xc)))
+        stop = pos + len(xf)
+        new = (bounds > pos) & (bounds <= stop)
+        csums[new] = csum[bounds[new] - pos]
+        csums2[new] = csum2[bounds[new] - pos]
+        pending = np.concatenate((pending, xf))
+        pos = stop
+        # filling intervals whose averaging intervals are passed
+        ready = np.searchsorted(iecalc[:-1], pos, side='right')
+        if pos == n:
+            ready = len(iecalc)
+        stop = min(ifill[ready], pos)
+        if first >= stop:
+            yield np.zeros(0)
+            continue
+        r = max(np.searchsorted(ifill, first, side='right') - 1, 0)
+        ib = np.searchsorted(bounds, ibcalc[r:ready])
+        ie = np.searchsorted(bounds, iecalc[r:ready])
+        sigma = _sigma(csums[ib], csums[ie], csums2[ib], csums2[ie],
+                       iecalc[r:ready] - ibcalc[r:ready])
+        x = pending[:stop - first]
+        s = x.copy()
+        head = min(max(ifill[0] - first, 0), len(x))
+        s[head:] = np.repeat(sigma, np.diff(np.clip(ifill[r:ready + 1],
+                                                    first, stop)))
+        ind = np.flatnonzero((x < mean - s) | (x > mean + s)) + first
+        pending = pending[stop - first:]
+        first = stop
+        yield t[ind]
+
+
+def _extended(t, at):
+    """
+    Returns time sequence of artifacts with the first and the last
+    times of signal added
+
+    """
+    return np.concatenate(([t[0]], at, [t[-1]]))
+
+
+def _longest(atl, n, dt):
+    """
+    Selects longest fragment with n artifacts in extended time sequence
+    of artifacts
+
+    """
+    df = atl[n+1:] - atl[:len(atl)-(n+1)]
+    i = np.argmax(df)
+    return (atl[i]+dt, atl[i]+df[i]-dt)
+
+
 def longest_fragment(t, at, n=0):
     """
     Selects longest fragment of signal with n artifacts
@@ -149,11 +553,7 @@ def longest_fragment(t, at, n=0):
     :returns: tuple
 
     """
-    atl = [t[0]] + list(at) + [t[-1]]
-    dt = t[1]-t[0]
-    df = [j-i for i, j in zip(atl[:-(n+1)], atl[(n+1):])]
-    atln = atl[np.argmax(df)]
-    return (atln+dt, atln+max(df)-dt)
+    return _longest(_extended(t, at), n, t[1]-t[0])
 
 
 def quality(t, at, n=0):
@@ -177,53 +577,290 @@ def quality(t, at, n=0):
     return (stop - start + dt) / (t[-1] - t[0] + dt)
 
 
+def quality_curve(t, at, ns=None):
+    """
+    Calculates the quality of signal for several numbers of artifacts
+
+    :param t: Time sequence (sec)
+    :type t: numpy.ndarray
+
+    :param at: Time sequence where artifacts are located (sec)
+    :type at: numpy.ndarray
+
+    :param ns: Numbers of artifacts, numbers greater than the number
+               of artifacts are treated as the number of artifacts,
+               if None, all numbers from 0 to the number of artifacts
+               are used
+    :type ns: array_like
+
+    :returns: numpy.ndarray
+
+    """
+    atl = _extended(t, at)
+    if ns is None:
+        ns = np.arange(len(atl) - 1)
+    dt = t[1] - t[0]
+    span = t[-1] - t[0] + dt
+    q = np.empty(len(ns))
+    for i, n in enumerate(np.minimum(ns, len(atl) - 2)):
+        start, stop = _longest(atl, n, dt)
+        q[i] = (stop - start + dt) / span
+    return q
+
+
+def _argmax_table(d):
+    """
+    Builds sparse table of indices of the first maximal values in
+    intervals of length 2**k
+
+    """
+    table = [np.arange(len(d))]
+    k = 1
+    while 2**k <= len(d):
+        prev = table[-1]
+        left = prev[:len(d) - 2**k + 1]
+        right = prev[2**(k-1):2**(k-1) + len(left)]
+        table.append(np.where(d[right] > d[left], right, left))
+        k += 1
+    return table
+
+
+def _argmax_query(d, table, start, stop):
+    """
+    Finds indices of the first maximal values in intervals
+    [start, stop] using sparse table
+
+    """
+    k = np.zeros(len(start), dtype=int)
+    num = stop - start + 1
+    while np.any(2**(k+1) <= num):
+        k += 2**(k+1) <= num
+    left = np.empty(len(start), dtype=int)
+    right = np.empty(len(start), dtype=int)
+    for level in np.unique(k):
+        ind = k == level
+        left[ind] = table[level][start[ind]]
+        right[ind] = table[level][stop[ind] - 2**level + 1]
+    return np.where(d[right] > d[left], right, left)
+
+
+def _fragments_quality(t, at, starts, ln, n, d, table):
+    """
+    Calculates the quality of fragments of given length
+
+    """
+    a = t.searchsorted(starts, side='left')
+    b = t.searchsorted(starts + ln, side='left')
+    p = np.searchsorted(at, starts, side='left')
+    q = np.searchsorted(at, starts + ln, side='left')
+    first = t[a]
+    last = t[b-1]
+    dt = t[a+1] - first
+    # the first gap, it is the only one if there are n artifacts or
+    # less
+    few = q - p <= n
+    gap = last - first
+    beg = first.copy()
+    if not np.all(few):
+        ind = np.flatnonzero(~few)
+        gap[ind] = at[p[ind] + n] - first[ind]
+        # gaps between artifacts
+        inner = ~few & (q - p >= n + 2)
+        if np.any(inner):
+            j = _argmax_query(d, table, p[inner], q[inner] - n - 2)
+            ind = np.flatnonzero(inner)
+            better = d[j] > gap[ind]
+            gap[ind[better]] = d[j[better]]
+            beg[ind[better]] = at[j[better]]
+        # the last gap
+        ind = np.flatnonzero(~few)
+        j = q[ind] - 1 - n
+        last_gap = last[ind] - at[j]
+        better = last_gap > gap[ind]
+        gap[ind[better]] = last_gap[better]
+        beg[ind[better]] = at[j[better]]
+    start = beg + dt
+    stop = beg + gap - dt
+    return (stop - start + dt) / (last - first + dt)
+
+
+@profiled('at')
 def best_fragment(t, at, ln, percents=False, n=0):
     """
     Selects the best signal's fragment of a given length
 
+    The artifacts of candidate fragments are found with searchsorted
+    and the longest gaps between them are found with sparse table, so
+    the complexity is O(n log n).
+
     :param t: Time sequence (sec)
     :type t: numpy.ndarray
 
     :param at: Time sequence where artifacts are located (sec)
     :type at: numpy.ndarray
 
-    :param ln: Length of a fragment (sec)
-    :type ln: float
+    :param ln: Length of a fragment (sec) or list of lengths
+    :type ln: float or list
 
-    :returns: tuple
+    :param percents: If True, the length is given in percents of
+                     length of signal
+    :type percents: bool
 
+    :param n: Number of artifacts, if a fragment has less artifacts it
+              is treated as having n artifacts
+    :type n: integer
+
+    :returns: tuple or list of tuples for list of lengths
+
+    """
+    at = np.asarray(at, dtype=float)
+    d = at[n+1:] - at[:max(len(at)-(n+1), 0)]
+    table = _argmax_table(d)
+    res = []
+    for ln_i in np.atleast_1d(ln):
+        if percents:
+            ln_i *= t[-1] / 100
+        # array of the first points of the fragments:
+        last = t[-1] - ln_i
+        starts = np.concatenate((
+            [t[0]], at[t[-1]-at >= ln_i],
+            t[t.searchsorted(last, side='left'):
+              t.searchsorted(last, side='right')]))
+        aq = _fragments_quality(t, at, starts, ln_i, n, d, table)
+        # the first point of the best fragment:
+        start = starts[np.argmax(aq)]
+        res.append((start, start+ln_i))
+    if np.ndim(ln):
+        return res
+    return res[0]
+
+
+def _compatible(cand, label, first, keys, num):
     """
-    if percents:
-        ln *= t[-1] / 100
-    # array of the first points of the fragments:
-    part_1 = [t[0]] + list([at_i for at_i in at[t[-1]-at >= ln]])
-    part_2 = [t_i for t_i in t[t == t[-1] - ln]]
-    atl = np.array(part_1 + part_2)
-    # quality array
-    aq = [quality(t[(t >= i) & (t < i+ln)],
-                  [j for j in at[(at >= i) & (at < i+ln)]],
-                  n)
-          for i in atl]
-    # the first point of the best fragment:
-    start = atl[np.argmax(aq)]
-    return(start, start+ln)
+    Checks if all candidates located in windows [first[j], j) of
+    times are the artifacts of one group only and this group has an
+    artifact at the time j
 
+    """
+    csum = np.concatenate(([0], np.cumsum(cand)))
+    a = csum[first]
+    count = csum[:-1] - a
+    res = count == 0
+    ind = np.flatnonzero(~res)
+    if len(ind) == 0:
+        return res
+    lab = label[cand]
+    changes = np.concatenate(([0], np.cumsum(lab[1:] != lab[:-1])))
+    a = a[ind]
+    b = csum[ind] - 1
+    lab = lab[a]
+    query = ind * num + lab
+    pos = np.minimum(keys.searchsorted(query), len(keys) - 1)
+    res[ind] = ((changes[b] == changes[a]) & (lab >= 0)
+                & (keys[pos] == query))
+    return res
+
+
+def _sweep(keep, check, label, first, groups, times, sizes):
+    """
+    Checks the remaining times one by one with a sliding window of
+    the numbers of kept times of every label
 
-def merge_artifacts(at1, at2):
+    """
+    keep = keep.tolist()
+    label = label.tolist()
+    first = first.tolist()
+    counts = {}
+    lo = hi = 0
+    for j in np.flatnonzero(check).tolist():
+        if first[j] >= hi:
+            # the window does not overlap the previous one
+            counts = {}
+            lo = hi = first[j]
+        while hi < j:
+            if keep[hi]:
+                counts[label[hi]] = counts.get(label[hi], 0) + 1
+            hi += 1
+        while lo < first[j]:
+            if keep[lo]:
+                counts[label[lo]] -= 1
+                if counts[label[lo]] == 0:
+                    del counts[label[lo]]
+            lo += 1
+        if len(counts) == 1:
+            (lab,) = counts
+            if label[j] >= 0:
+                keep[j] = lab == label[j]
+            else:
+                own = groups[times[j]:times[j] + sizes[j]]
+                keep[j] = lab >= 0 and lab in own
+        else:
+            keep[j] = not counts
+    return np.array(keep, dtype=bool)
+
+
+def merge_artifacts(*ats, tol=0):
     """
     Merges artifacts locations.
 
-    :param at1: Time sequence where artifacts from 1'st group are located (sec)
-    :type at1: numpy.ndarray
-
-    :param at2: Time sequence where artifacts from 2'nd group are located (sec)
-    :type at2: numpy.ndarray
+    The artifacts of all groups are sorted by time once and an
+    artifact is skipped if a kept artifact of other group is located
+    not farther than tol before it. Artifacts of several groups
+    located at the same time are treated as one artifact of all these
+    groups. Repeated artifacts of all groups except the 1'st one are
+    skipped too, as it was done for two groups before, so the 1'st
+    group keeps its duplicates and the result does not depend on the
+    order of the other groups (and of all groups without repeated
+    artifacts).
+
+    The artifacts which are kept or skipped whatever of other close
+    artifacts are found with vectorized operations in O(N log N) for
+    N artifacts total, with tol=0 these are all of them. The rest are
+    checked by a sweep in Python with a sliding window, it is linear
+    in the number of artifacts located not farther than tol before
+    them, so it is O(N) in the worst case of dense artifacts.
+
+    :param ats: Time sequences where artifacts from groups are located
+                (sec)
+    :type ats: numpy.ndarray
+
+    :param tol: Tolerance (sec), artifacts from different groups
+                located closer are treated as the same artifact
+    :type tol: float
 
     :returns: numpy.ndarray
 
     """
-    at = list(at1)
-    for at2_i in at2:
-        if at2_i not in at:
-            at.append(at2_i)
-    return np.array(sorted(at))
+    ats = [np.sort(np.asarray(at, dtype=float), kind='stable') for at in ats]
+    if not ats:
+        return np.zeros(0)
+    at = np.concatenate(ats)
+    groups = np.repeat(np.arange(len(ats)), [len(at_i) for at_i in ats])
+    order = np.lexsort((groups, at))
+    at = at[order]
+    groups = groups[order]
+    # pairs of time and group, repeated only in the 1'st group
+    new = np.ones(len(at), dtype=bool)
+    new[1:] = (at[1:] != at[:-1]) | (groups[1:] != groups[:-1])
+    pairs = np.flatnonzero(new)
+    copies = np.diff(np.concatenate((pairs, [len(at)])))
+    at = at[pairs]
+    groups = groups[pairs]
+    # times shared by groups
+    new = np.ones(len(at), dtype=bool)
+    new[1:] = at[1:] != at[:-1]
+    times = np.flatnonzero(new)
+    sizes = np.diff(np.concatenate((times, [len(at)])))
+    label = np.where(sizes == 1, groups[times], -1)
+    keys = (np.cumsum(new) - 1) * len(ats) + groups
+    copies = np.where(groups[times] == 0, copies[times], 1)
+    at = at[times]
+    first = at.searchsorted(at - tol, side='left')
+    # kept whatever of close artifacts are kept
+    keep = _compatible(np.ones(len(at), dtype=bool), label, first, keys,
+                       len(ats))
+    # skipped because of close artifacts surely kept
+    check = ~keep & _compatible(keep, label, first, keys, len(ats))
+    if np.any(check):
+        keep = _sweep(keep, check, label, first, groups, times, sizes)
+    return np.repeat(at[keep], copies[keep])
@@ -17,10 +17,16 @@
 
 
 """Parametes of electrogastroenterography signals and some help
-functions."""
+functions. scipy.signal and scipy.fft are imported on first use of a
+window given by name and on first transform, so importing the module
+is fast."""
+
+from functools import lru_cache
 
 import numpy as np
-import dsplab.spectran as sp
+from numpy.lib.stride_tricks import as_strided
+
+from egegsignals.profiling import profiled
 
 
 organ_names = [
@@ -41,6 +47,15 @@ egeg_fs = {
 }
 
 
+parameter_names = [
+    'dominant_frequency',
+    'energy',
+    'power',
+    'rhythmicity',
+    'rhythmicity_norm',
+]
+
+
 def next_organ_name(organ_name):
     """Returns the name of next organ in gastro-intestinal tract.
 
@@ -60,123 +75,615 @@ def next_organ_name(organ_name):
     return None
 
 
-def dominant_frequency(spectrum, dt, fs):
+# maximal number of frequency axes and bands kept in cache
+CACHE_SIZE = 256
+
+
+def _band_index(f, fs, n):
+    """Return index of band of frequencies in the frequency axis of
+    spectrum of signal of n samples. For non-negative bands it is a
+    slice of the sorted non-negative part of the axis (without
+    frequency -1/(2 dt) for even n), otherwise it is an array of
+    indices."""
+    if fs[0] >= 0:
+        half = f[:(n + 1) // 2]
+        return slice(int(np.searchsorted(half, fs[0], side='left')),
+                     int(np.searchsorted(half, fs[1], side='right')))
+    return np.flatnonzero((f >= fs[0]) & (f <= fs[1]))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _freqs(n, dt, one_side=False):
+    """Return read-only frequency axis of two-side or one-side
+    spectrum of signal of n samples."""
+    f = np.fft.rfftfreq(n, dt) if one_side else np.fft.fftfreq(n, dt)
+    f.setflags(write=False)
+    return f
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _band(n, dt, f_min, f_max, one_side=False):
+    """Return index of band in two-side or one-side spectrum of signal
+    of n samples and frequencies of the band."""
+    f = _freqs(n, dt, one_side)
+    ind = _band_index(f, (f_min, f_max), n)
+    if not isinstance(ind, slice):
+        ind.setflags(write=False)
+    f_band = f[ind]
+    f_band.setflags(write=False)
+    return ind, f_band
+
+
+def cache_info():
+    """Return statistics of cache of frequency axes and bands.
+
+    Returns
+    -------
+    : dict
+        Hits, misses, maximal and current sizes of caches for
+        frequency axes ('freqs') and bands ('bands').
+    """
+    return {
+        'freqs': _freqs.cache_info()._asdict(),
+        'bands': _band.cache_info()._asdict(),
+    }
+
+
+def cache_clear():
+    """Clear cache of frequency axes and bands."""
+    _freqs.cache_clear()
+    _band.cache_clear()
+
+
+def _length(size, one_side, n):
+    """Return number of samples of signal for spectrum of given size."""
+    if n is None:
+        n = 2 * (size - 1) if one_side else size
+    if size != (n // 2 + 1 if one_side else n):
+        raise ValueError("length of spectrum {} does not match number "
+                         "of samples {}".format(size, n))
+    return n
+
+
+def _band_spectrum(spectrum, dt, fs, axis, one_side=False, n=None):
+    """Return the part of spectrum (or spectra) in band with frequency
+    axis moved to the end, frequencies of the band and number of
+    samples of signal."""
+    if one_side and fs[0] < 0:
+        raise ValueError("one-side spectrum has no negative frequencies")
+    spectrum = np.moveaxis(np.asarray(spectrum), axis, -1)
+    n = _length(spectrum.shape[-1], one_side, n)
+    ind, f_band = _band(n, dt, fs[0], fs[1], one_side)
+    return spectrum[..., ind], f_band, n
+
+
+def _envelope(band, wrap):
+    """Return envelope of band of spectrum. If wrap is True, the
+    difference between the last and the first values is added as it is
+    done in Gastroscan-GEM."""
+    envelope = np.sum(np.abs(np.diff(band, axis=-1)), axis=-1)
+    if wrap:
+        envelope = envelope + np.abs(band[..., 0] - band[..., -1])
+    return envelope
+
+
+def dominant_frequency(spectrum, dt, fs, axis=-1, one_side=False, n=None):
     """Return dominant frequency of signal in band of frequencies.
 
     Parameters
     ----------
     spectrum : array_like
-        Pre-calculated two-side spectrum.
+        Pre-calculated two-side or one-side spectrum or several spectra.
     dt : float
         Sampling period.
     fs : array_like
         Two frequencies bounds.
+    axis : int
+        Axis of frequencies in spectra.
+    one_side : bool
+        If True, spectrum is one-side (abs of numpy.fft.rfft). The
+        band must be non-negative.
+    n : int
+        Number of samples of signal. It is needed for one-side
+        spectrum of signal of odd length only.
 
     Returns
     -------
-    : float
-        Value of parameter.
+    : float or numpy.ndarray
+        Value of parameter. For several spectra the array of values.
     """
-    f = np.fft.fftfreq(len(spectrum), dt)
-    ind = (f >= fs[0]) & (f <= fs[1])
-    df_ind = spectrum[ind].argmax()
-    return f[ind][df_ind]
+    band, f_band, _ = _band_spectrum(spectrum, dt, fs, axis, one_side, n)
+    return f_band[band.argmax(axis=-1)]
 
 
-def energy(spectrum, dt, fs):
+def energy(spectrum, dt, fs, axis=-1, one_side=False, n=None):
     """Return the energy of the part of the specturm.
 
     Parameters
     ----------
     spectrum : array_like
-       Pre-calculated two-side spectrum.
+       Pre-calculated two-side or one-side spectrum or several spectra.
     dt : float
        Sampling period
     fs : array_like
        Two frequencies bounds
+    axis : int
+        Axis of frequencies in spectra.
+    one_side : bool
+        If True, spectrum is one-side (abs of numpy.fft.rfft). The
+        band must be non-negative. The value is the same as for
+        two-side spectrum since only positive frequencies are summed.
+    n : int
+        Number of samples of signal. It is needed for one-side
+        spectrum of signal of odd length only.
 
     Returns
     -------
-    : float
-        Value of parameter.
+    : float or numpy.ndarray
+        Value of parameter. For several spectra the array of values.
     """
-    f = np.fft.fftfreq(len(spectrum), dt)
-    ind = (f >= fs[0]) & (f <= fs[1])
-    return dt * sum(spectrum[ind]**2) / len(spectrum)
+    band, _, n = _band_spectrum(spectrum, dt, fs, axis, one_side, n)
+    return dt * np.sum(band**2, axis=-1) / n
 
 
-def power(spectrum, dt, fs):
+def power(spectrum, dt, fs, axis=-1, one_side=False, n=None):
     """Return the power of the part of the specturm.
 
     Parameters
     ----------
     spectrum : array_like
-       Pre-calculated tw-side spectrum.
+       Pre-calculated two-side or one-side spectrum or several spectra.
     dt : float
        Sampling period
     fs : array_like
        Two frequencies bounds
+    axis : int
+        Axis of frequencies in spectra.
+    one_side : bool
+        If True, spectrum is one-side (abs of numpy.fft.rfft). The
+        band must be non-negative. The value is the same as for
+        two-side spectrum since only positive frequencies are summed.
+    n : int
+        Number of samples of signal. It is needed for one-side
+        spectrum of signal of odd length only.
 
     Returns
     -------
-    : float
-        Value of parameter.
+    : float or numpy.ndarray
+        Value of parameter. For several spectra the array of values.
     """
-    return energy(spectrum, dt, fs) / (len(spectrum) * dt)
+    band, _, n = _band_spectrum(spectrum, dt, fs, axis, one_side, n)
+    return dt * np.sum(band**2, axis=-1) / n / (n * dt)
 
 
-def rhythmicity(spectrum, dt, fs):
+def rhythmicity(spectrum, dt, fs, axis=-1, wrap=True, one_side=False,
+                n=None):
     """Return Gastroscan-GEM version of the rhythmicity
     coefficient. Do not use it.
 
     Parameters
     ----------
     spectrum : array_like
-       Pre-calculated two-side spectrum.
+       Pre-calculated two-side or one-side spectrum or several spectra.
     dt : float
        Sampling period
     fs : array_like
        Two frequencies bounds
+    axis : int
+        Axis of frequencies in spectra.
+    wrap : bool
+        If True, the difference between the last and the first values
+        in band is added to the envelope as it is done in
+        Gastroscan-GEM.
+    one_side : bool
+        If True, spectrum is one-side (abs of numpy.fft.rfft). The
+        band must be non-negative.
+    n : int
+        Number of samples of signal. It is needed for one-side
+        spectrum of signal of odd length only.
 
     Returns
     -------
-    : float
-        Value of parameter.
+    : float or numpy.ndarray
+        Value of parameter. For several spectra the array of values.
     """
-    f = np.fft.fftfreq(len(spectrum), dt)
-    ind = (f >= fs[0]) & (f <= fs[1])
-    spectrum = spectrum[ind]
-    envelope = sum([abs(spectrum[i] - spectrum[i-1])
-                    for i in range(len(spectrum))])
-    return envelope / len(spectrum)
+    band = _band_spectrum(spectrum, dt, fs, axis, one_side, n)[0]
+    return _envelope(band, wrap) / band.shape[-1]
 
 
-def rhythmicity_norm(spectrum, dt, fs):
+def rhythmicity_norm(spectrum, dt, fs, axis=-1, wrap=True, one_side=False,
+                     n=None):
     """Return normalized Gastroscan-GEM version of the rhythmicity coefficient.
 
     Parameters
     ----------
     spectrum : array_like
-       Pre-calculated two-side spectrum.
+       Pre-calculated two-side or one-side spectrum or several spectra.
     dt : float
        Sampling period
     fs : array_like
        Two frequencies bounds
+    axis : int
+        Axis of frequencies in spectra.
+    wrap : bool
+        If True, the difference between the last and the first values
+        in band is added to the envelope as it is done in
+        Gastroscan-GEM.
+    one_side : bool
+        If True, spectrum is one-side (abs of numpy.fft.rfft). The
+        band must be non-negative.
+    n : int
+        Number of samples of signal. It is needed for one-side
+        spectrum of signal of odd length only.
 
     Returns
     -------
-    : float
-        Value of parameter.
+    : float or numpy.ndarray
+        Value of parameter. For several spectra the array of values.
+    """
+    band = _band_spectrum(spectrum, dt, fs, axis, one_side, n)[0]
+    return _envelope(band, wrap) / band.shape[-1] / np.max(band, axis=-1)
+
+
+@profiled('spectrum')
+def band_parameters(spectrum, dt, bands=None, axis=-1, wrap=True,
+                    one_side=False, n=None):
+    """Return all parameters for several bands of frequencies in one
+    pass over the spectrum.
+
+    Parameters
+    ----------
+    spectrum : array_like
+        Pre-calculated two-side or one-side spectrum or several spectra.
+    dt : float
+        Sampling period.
+    bands : dict
+        Two frequencies bounds for every band. If None egeg_fs is
+        used.
+    axis : int
+        Axis of frequencies in spectra.
+    wrap : bool
+        Use Gastroscan-GEM envelope for rhythmicity (see
+        rhythmicity).
+    one_side : bool
+        If True, spectrum is one-side (abs of numpy.fft.rfft). The
+        bands must be non-negative. Energy and power are the same as
+        for two-side spectrum.
+    n : int
+        Number of samples of signal. It is needed for one-side
+        spectrum of signal of odd length only.
+
+    Returns
+    -------
+    : dict
+        Values of parameters (see parameter_names) for every band. For
+        several spectra values are arrays.
     """
-    f = np.fft.fftfreq(len(spectrum), dt)
-    ind = (f >= fs[0]) & (f <= fs[1])
-    spectrum = spectrum[ind]
-    envelope = sum([abs(spectrum[i] - spectrum[i-1])
-                    for i in range(len(spectrum))])
-    return envelope / len(spectrum) / np.max(spectrum)
+    if bands is None:
+        bands = egeg_fs
+    res = {}
+    for name, fs in bands.items():
+        band, f_band, n = _band_spectrum(spectrum, dt, fs, axis, one_side, n)
+        res[name] = _parameters(band, f_band, n, dt, wrap)
+    return res
+
+
+def _parameters(band, f_band, n, dt, wrap):
+    """Return all parameters of band of spectrum of signal of n
+    samples."""
+    rhythm = _envelope(band, wrap) / band.shape[-1]
+    band_energy = dt * np.sum(band**2, axis=-1) / n
+    return {
+        'dominant_frequency': f_band[band.argmax(axis=-1)],
+        'energy': band_energy,
+        'power': band_energy / (n * dt),
+        'rhythmicity': rhythm,
+        'rhythmicity_norm': rhythm / np.max(band, axis=-1),
+    }
+
+
+class Spectrum:
+    """Amplitude spectrum of signal together with sampling period. The
+    frequency axis, bands and parameters of organs are calculated on
+    first request and kept.
 
+    Parameters
+    ----------
+    magnitudes : array_like
+        Two-side spectrum (abs of numpy.fft.fft) or one-side spectrum
+        (abs of numpy.fft.rfft). Several spectra have frequencies
+        along the last axis.
+    dt : float
+        Sampling period.
+    one_side : bool
+        If True, magnitudes is one-side spectrum.
+    n : int
+        Number of samples of signal. It is needed for one-side spectrum
+        of signal of odd length only.
+    """
+    __slots__ = ('magnitudes', 'dt', 'one_side', 'n', '_bands', '_params')
+
+    def __init__(self, magnitudes, dt, one_side=False, n=None):
+        magnitudes = np.asarray(magnitudes)
+        self.magnitudes = magnitudes
+        self.dt = dt
+        self.one_side = one_side
+        self.n = _length(magnitudes.shape[-1], one_side, n)
+        self._bands = {}
+        self._params = {}
+
+    @classmethod
+    def from_signal(cls, x, dt, one_side=True, dtype=None):
+        """Return spectrum of signal.
+
+        Parameters
+        ----------
+        x : array_like
+            Signal or several signals (along the last axis).
+        dt : float
+            Sampling period.
+        one_side : bool
+            If True, only non-negative frequencies are kept.
+        dtype : numpy.dtype
+            Type of samples used in calculations. With numpy.float32
+            the magnitudes are float32 too (see stft).
+
+        Returns
+        -------
+        : Spectrum
+            Spectrum.
+        """
+        from scipy import fft
+        x = np.asarray(x, dtype=dtype)
+        transform = fft.rfft if one_side else fft.fft
+        return cls(np.abs(transform(x)), dt, one_side, x.shape[-1])
+
+    @property
+    def freqs(self):
+        """Frequency axis."""
+        return _freqs(self.n, self.dt, self.one_side)
+
+    def band(self, organ):
+        """Return band of spectrum.
+
+        Parameters
+        ----------
+        organ : str or tuple
+            Name of organ (see egeg_fs) or two frequencies bounds.
+
+        Returns
+        -------
+        : numpy.ndarray
+            Magnitudes in band.
+        : numpy.ndarray
+            Frequencies of band.
+        """
+        if organ not in self._bands:
+            fs = egeg_fs[organ] if isinstance(organ, str) else organ
+            ind, f_band = _band(self.n, self.dt, fs[0], fs[1], self.one_side)
+            self._bands[organ] = (self.magnitudes[..., ind], f_band)
+        return self._bands[organ]
+
+    def parameters(self, organ, wrap=True):
+        """Return all parameters for organ.
+
+        Parameters
+        ----------
+        organ : str or tuple
+            Name of organ (see egeg_fs) or two frequencies bounds.
+        wrap : bool
+            Use Gastroscan-GEM envelope for rhythmicity (see
+            rhythmicity).
+
+        Returns
+        -------
+        : dict
+            Values of parameters (see parameter_names).
+        """
+        key = (organ, wrap)
+        if key not in self._params:
+            band, f_band = self.band(organ)
+            self._params[key] = _parameters(band, f_band, self.n, self.dt,
+                                            wrap)
+        return self._params[key]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_window(window, nseg):
+    """Return read-only window scaled for saving energy of segment."""
+    from scipy.signal import get_window
+    win = get_window(window, nseg)
+    win = win * nseg / np.sum(win)
+    win.setflags(write=False)
+    return win
+
+
+def _window(window, nseg):
+    """Return window scaled for saving energy of segment. Windows
+    given by name are cached."""
+    if isinstance(window, (str, tuple)):
+        return _cached_window(window, nseg)
+    win = np.asarray(window, dtype=float)
+    return win * nseg / np.sum(win)
+
+
+def _segments(x, nseg, nstep):
+    """Return read-only view of signal splitted to segments."""
+    x = np.ascontiguousarray(x)
+    nsegs = max((len(x) - nseg) // nstep + 1, 0)
+    return as_strided(x, shape=(nsegs, nseg),
+                      strides=(nstep * x.strides[0], x.strides[0]),
+                      writeable=False)
+
+
+@profiled('x')
+def stft(x, dt, nseg, nstep=None, window='hamming', nfft=None,
+         padded=False, one_side=False, dtype=None):
+    """Return result of short-time Fourier transform.
 
-def dfic(fs, x, dt, nseg, nstep, window='hamming', nfft=None, padded=False):
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Signal.
+    dt : float
+       Sampling period.
+    nseg : int
+        Length of segment (in samples).
+    nstep : int
+        Length of step (in samples). If None, it is nseg // 2.
+    window : str, tuple or array_like
+        Window (see scipy.signal.get_window).
+    nfft : int
+        Length of the FFT. If None or less than nseg, the FFT length
+        is nseg.
+    padded : bool
+        If True, the signal is padded with zeros to the length
+        multiple of nseg.
+    one_side : bool
+        If True, only non-negative frequencies are calculated (see
+        numpy.fft.rfft).
+    dtype : numpy.dtype
+        Type of samples used in calculations. For numpy.float32 the
+        spectra are calculated by scipy.fft in single precision and
+        are float32, the error of magnitudes is about 2e-7 of the
+        maximal magnitude. If None, it is float64.
+
+    Returns
+    -------
+    : numpy.ndarray
+        Amplitude spectra of segments. Windowed segments are scaled
+        by length of segment divided by the sum of window.
+    """
+    if not nstep:
+        nstep = nseg // 2
+    x = np.asarray(x, dtype=dtype)
+    if padded and len(x) % nseg:
+        x_padded = np.zeros(len(x) + nseg - len(x) % nseg,
+                            dtype=dtype or np.result_type(x, float))
+        x_padded[:len(x)] = x
+        x = x_padded
+    win = _window(window, nseg)
+    if dtype:
+        win = win.astype(dtype)
+    segs = _segments(x, nseg, nstep) * win
+    n = max(nfft or 0, nseg)
+    from scipy import fft
+    if one_side:
+        return abs(fft.rfft(segs, n, axis=-1))
+    return abs(fft.fft(segs, n, axis=-1))
+
+
+def _power_sum(segs, win, n):
+    """Return sum of squared magnitudes of one-side spectra of
+    windowed segments."""
+    from scipy.fft import rfft
+    spectra = rfft(segs * win, n, axis=-1)
+    power = np.square(spectra.real)
+    power += np.square(spectra.imag)
+    return power.sum(axis=0)
+
+
+@profiled('x')
+def welch(x, dt, nseg, nstep=None, window='hamming', nfft=None, batch=None,
+          dtype=None):
+    """Return one-side amplitude spectrum averaged by Welch's method.
+    The squared magnitudes of spectra of segments are averaged and
+    the square root is returned, so energy of band is the average of
+    energies of segments.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Signal.
+    dt : float
+       Sampling period.
+    nseg : int
+        Length of segment (in samples).
+    nstep : int
+        Length of step (in samples). If None, it is nseg // 2.
+    window : str, tuple or array_like
+        Window (see scipy.signal.get_window).
+    nfft : int
+        Length of the FFT. If None or less than nseg, the FFT length
+        is nseg.
+    batch : int
+        Number of segments transformed at once. If None, all segments
+        are transformed at once, otherwise the memory does not depend
+        on the length of signal.
+    dtype : numpy.dtype
+        Type of samples used in calculations (see stft).
+
+    Returns
+    -------
+    : numpy.ndarray
+        Averaged spectrum of nfft // 2 + 1 frequencies (see
+        numpy.fft.rfftfreq). Windowed segments are scaled as in stft.
+    """
+    if not nstep:
+        nstep = nseg // 2
+    x = np.asarray(x, dtype=dtype)
+    win = _window(window, nseg)
+    if dtype:
+        win = win.astype(dtype)
+    n = max(nfft or 0, nseg)
+    segs = _segments(x, nseg, nstep)
+    if not len(segs):
+        raise ValueError("signal is shorter than segment")
+    if batch is None:
+        power = _power_sum(segs, win, n)
+    else:
+        power = np.zeros(n // 2 + 1, dtype=dtype or float)
+        for start in range(0, len(segs), batch):
+            power += _power_sum(segs[start:start + batch], win, n)
+    power /= len(segs)
+    return np.sqrt(power, out=power)
+
+
+def welch_parameters(x, dt, nseg, nstep=None, window='hamming', nfft=None,
+                     bands=None, wrap=True, batch=None, dtype=None):
+    """Return all parameters for several bands of frequencies of
+    spectrum averaged by Welch's method (see welch). The values are
+    less noisy than ones of spectrum of the whole signal.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Signal.
+    dt : float
+       Sampling period.
+    nseg : int
+        Length of segment (in samples).
+    nstep : int
+        Length of step (in samples). If None, it is nseg // 2.
+    window : str, tuple or array_like
+        Window (see scipy.signal.get_window).
+    nfft : int
+        Length of the FFT. If None or less than nseg, the FFT length
+        is nseg.
+    bands : dict
+        Two frequencies bounds for every band. If None egeg_fs is
+        used.
+    wrap : bool
+        Use Gastroscan-GEM envelope for rhythmicity (see
+        rhythmicity).
+    batch : int
+        Number of segments transformed at once (see welch).
+    dtype : numpy.dtype
+        Type of samples used in calculations (see stft).
+
+    Returns
+    -------
+    : dict
+        Values of parameters (see parameter_names) for every band.
+    """
+    spectrum = welch(x, dt, nseg, nstep, window, nfft, batch, dtype)
+    return band_parameters(spectrum, dt, bands, wrap=wrap, one_side=True,
+                           n=max(nfft or 0, nseg))
+
+
+@profiled('x')
+def dfic(fs, x, dt, nseg, nstep, window='hamming', nfft=None, padded=False,
+         return_dfs=False, dtype=None):
     """Return dominant frequency instability coefficient.
 
     Parameters
@@ -187,28 +694,198 @@ def dfic(fs, x, dt, nseg, nstep, window='hamming', nfft=None, padded=False):
         Signal.
     dt : float
        Sampling period.
-    window : str
-        Type of window.
     nseg : int
         Length of segment (in samples).
     nstep : int
         Length of step (in samples).
+    window : str, tuple or array_like
+        Window (see scipy.signal.get_window).
     nfft : int
         Length of the FFT. Use it for doing magick with resolution in
         spectrum. If None or less than nseg, the FFT length is nseg.
+    padded : bool
+        If True, the signal is padded with zeros to the length
+        multiple of nseg.
+    return_dfs : bool
+        If True, the dominant frequencies of all segments are returned
+        too.
+    dtype : numpy.dtype
+        Type of samples used in calculations (see stft). With
+        numpy.float32 dominant frequency of segment can differ from
+        float64 one if two peaks differ less than by 1e-6.
 
     Returns
     -------
     : float
         Value of parameter.
+    : numpy.ndarray
+        Dominant frequencies of segments. Only if return_dfs is True.
     """
-    Xs = sp.stft(xdata=x, sample_rate=1.0/dt, nseg=nseg,
-                 nstep=nstep, window='hamming', nfft=nfft, padded=padded)
-    dfs = np.array([dominant_frequency(X, dt, fs) for X in Xs])
-    return np.std(dfs) / np.average(dfs)
+    # one-side spectra are enough for non-negative bands
+    one_side = fs[0] >= 0
+    Xs = stft(x, dt, nseg, nstep, window, nfft, padded, one_side, dtype)
+    ind, f_band = _band(max(nfft or 0, nseg), dt, fs[0], fs[1])
+    dfs = f_band[Xs[:, ind].argmax(axis=-1)]
+    value = np.std(dfs) / np.average(dfs)
+    if return_dfs:
+        return value, dfs
+    return value
+
+
+@profiled('x')
+def parameters_series(x, dt, nseg, nstep=None, window='hamming', nfft=None,
+                      organs=None, wrap=True, dtype=None):
+    """Return parameters of organs for every segment of signal. The
+    STFT is calculated once and every band is looked up once for all
+    segments.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Signal.
+    dt : float
+       Sampling period.
+    nseg : int
+        Length of segment (in samples).
+    nstep : int
+        Length of step (in samples). If None, it is nseg // 2.
+    window : str, tuple or array_like
+        Window (see scipy.signal.get_window).
+    nfft : int
+        Length of the FFT. If None or less than nseg, the FFT length
+        is nseg.
+    organs : list
+        Names of organs (see egeg_fs). If None, organ_names is used.
+    wrap : bool
+        Use Gastroscan-GEM envelope for rhythmicity (see
+        rhythmicity).
+    dtype : numpy.dtype
+        Type of samples used in calculations (see stft).
 
+    Returns
+    -------
+    : numpy.ndarray
+        Values of parameters (segments, organs, parameters). The
+        order of parameters is the same as in parameter_names.
+    """
+    if organs is None:
+        organs = organ_names
+    Xs = stft(x, dt, nseg, nstep, window, nfft, one_side=True, dtype=dtype)
+    n = max(nfft or 0, nseg)
+    res = np.empty((len(Xs), len(organs), len(parameter_names)),
+                   dtype=Xs.dtype)
+    for i, organ in enumerate(organs):
+        fs = egeg_fs[organ]
+        ind, f_band = _band(n, dt, fs[0], fs[1], True)
+        values = _parameters(Xs[:, ind], f_band, n, dt, wrap)
+        for j, name in enumerate(parameter_names):
+            res[:, i, j] = values[name]
+    return res
+
+
+class OnlineDFIC:
+    """Dominant frequency instability coefficient of signal coming by
+    chunks. The last nseg samples are kept in ring buffer and the
+    dominant frequency is calculated every nstep samples. The result
+    is the same as of dfic with padded=False applied to all the
+    samples received.
 
-def stft(x, dt, nseg, nstep, window='hamming', nfft=None, padded=False):
-    """Deprecated. Use dsplab instead."""
-    return sp.stft(xdata=x, sample_rate=1.0/dt, nseg=nseg,
-                   nstep=nstep, window='hamming', nfft=nfft, padded=padded)
+    Parameters
+    ----------
+    fs : array_like
+        Two frequencies bounds
+    dt : float
+       Sampling period.
+    nseg : int
+        Length of segment (in samples).
+    nstep : int
+        Length of step (in samples). If None, it is nseg // 2.
+    window : str, tuple or array_like
+        Window (see scipy.signal.get_window).
+    nfft : int
+        Length of the FFT. If None or less than nseg, the FFT length
+        is nseg.
+    """
+    def __init__(self, fs, dt, nseg, nstep=None, window='hamming',
+                 nfft=None):
+        self.fs = fs
+        self.dt = dt
+        self.nseg = nseg
+        self.nstep = nstep or nseg // 2
+        self.window = window
+        self.nfft = nfft
+        self._one_side = fs[0] >= 0
+        self._ind, self._f_band = _band(max(nfft or 0, nseg), dt,
+                                        fs[0], fs[1])
+        self._buf = np.zeros(nseg)
+        self._pos = 0
+        self._received = 0
+        self._next_stop = nseg
+        # running mean and sum of squared deviations (Welford)
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    @property
+    def count(self):
+        """Number of dominant frequencies calculated."""
+        return self._count
+
+    @property
+    def value(self):
+        """Current value of parameter. If no segments were received,
+        it is nan."""
+        if not self._count:
+            return np.nan
+        return np.sqrt(self._m2 / self._count) / self._mean
+
+    def update(self, x):
+        """Receive samples of signal.
+
+        Parameters
+        ----------
+        x : array_like
+            Next samples of signal.
+
+        Returns
+        -------
+        : numpy.ndarray
+            Dominant frequencies of segments finished by the samples.
+        """
+        x = np.asarray(x)
+        dfs = []
+        start = 0
+        while start < len(x):
+            stop = start + min(len(x) - start,
+                               self._next_stop - self._received)
+            self._write(x[start:stop])
+            self._received += stop - start
+            start = stop
+            if self._received == self._next_stop:
+                dfs.append(self._dominant_frequency())
+                self._next_stop += self.nstep
+        return np.array(dfs)
+
+    def _write(self, x):
+        """Write samples to ring buffer."""
+        if len(x) >= self.nseg:
+            self._buf[:] = x[-self.nseg:]
+            self._pos = 0
+            return
+        first = min(len(x), self.nseg - self._pos)
+        self._buf[self._pos:self._pos + first] = x[:first]
+        self._buf[:len(x) - first] = x[first:]
+        self._pos = (self._pos + len(x)) % self.nseg
+
+    def _dominant_frequency(self):
+        """Calculate dominant frequency of buffered segment and update
+        running statistics."""
+        seg = np.concatenate((self._buf[self._pos:], self._buf[:self._pos]))
+        X = stft(seg, self.dt, self.nseg, self.nseg, self.window,
+                 self.nfft, one_side=self._one_side)[0]
+        df = self._f_band[X[self._ind].argmax()]
+        self._count += 1
+        delta = df - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (df - self._mean)
+        return df
@@ -0,0 +1,158 @@
+# egegsignals - Software for processing electrogastroenterography signals.
+
+# Copyright (C) 2013 -- 2018 Aleksandr Popov
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Profiling of stages of processing. The stages (hfart.hfa_filter,
+hfart.three_sigma, hfart.outliers, parameters.stft and others) are
+timed only inside Profiler context, otherwise the cost is one check
+per call.
+
+Example::
+
+    with Profiler() as prof:
+        hfart.hfa(t, x)
+    print(prof.stats())
+"""
+
+import inspect
+import json
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+import numpy as np
+
+
+# profiler of current thread (or asyncio task)
+_active = ContextVar('profiler', default=None)
+
+
+class Profiler:
+    """Collects wall time, number of calls and sizes of arrays for
+    stages of processing. It is enabled inside with statement in the
+    current thread only.
+
+    Parameters
+    ----------
+    callback : callable
+        Function called as callback(name, elapsed, size) after every
+        stage.
+    """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self._stats = {}
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_active.set(self))
+        return self
+
+    def __exit__(self, *args):
+        _active.reset(self._tokens.pop())
+
+    def record(self, name, elapsed, size):
+        """Add the stage call to statistics.
+
+        Parameters
+        ----------
+        name : str
+            Name of stage.
+        elapsed : float
+            Wall time (sec).
+        size : int
+            Size of processed array.
+        """
+        stat = self._stats.setdefault(name, {
+            'calls': 0, 'time': 0.0, 'max_time': 0.0, 'size': 0,
+        })
+        stat['calls'] += 1
+        stat['time'] += elapsed
+        stat['max_time'] = max(stat['max_time'], elapsed)
+        stat['size'] += size
+        if self.callback:
+            self.callback(name, elapsed, size)
+
+    def stats(self):
+        """Return aggregated statistics.
+
+        Returns
+        -------
+        : dict
+            Number of calls, total and maximal wall time and total
+            size of processed arrays for every stage.
+        """
+        return {name: dict(stat) for name, stat in self._stats.items()}
+
+    def update(self, stats):
+        """Add statistics collected by other profiler (for example in
+        other process).
+
+        Parameters
+        ----------
+        stats : dict
+            Statistics returned by stats().
+        """
+        for name, other in stats.items():
+            stat = self._stats.setdefault(name, {
+                'calls': 0, 'time': 0.0, 'max_time': 0.0, 'size': 0,
+            })
+            stat['calls'] += other['calls']
+            stat['time'] += other['time']
+            stat['max_time'] = max(stat['max_time'], other['max_time'])
+            stat['size'] += other['size']
+
+    def reset(self):
+        """Clear statistics."""
+        self._stats = {}
+
+    def to_json(self, path):
+        """Save statistics to JSON file.
+
+        Parameters
+        ----------
+        path : str
+            Path to file.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.stats(), f, indent=2, sort_keys=True)
+
+
+def profiled(arg):
+    """Return decorator making a function a stage of processing.
+
+    Parameters
+    ----------
+    arg : str
+        Name of argument whose size is recorded.
+    """
+    def decorator(func):
+        name = '{}.{}'.format(func.__module__.split('.')[-1], func.__name__)
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active.get()
+            if profiler is None:
+                return func(*args, **kwargs)
+            size = np.size(signature.bind(*args, **kwargs).arguments.get(arg))
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(name, time.perf_counter() - start, size)
+        return wrapper
+    return decorator
@@ -0,0 +1,146 @@
+# egegsignals - Software for processing electrogastroenterography signals.
+
+# Copyright (C) 2013 -- 2018 Aleksandr Popov
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Loading of recordings. Samples are memory-mapped and the time
+sequence is calculated on demand, so large recordings are not read to
+memory at once."""
+
+import numpy as np
+
+
+class TimeAxis:
+    """Time sequence t0 + dt * i, i = 0, ..., n - 1 which is not kept in
+    memory. The values are the same as of t0 + dt * numpy.arange(n).
+    It can be used instead of time sequence in hfart functions.
+
+    Parameters
+    ----------
+    t0 : float
+        Time of the first sample.
+    dt : float
+        Sampling period.
+    n : int
+        Number of samples.
+    """
+    __slots__ = ('t0', 'dt', 'n')
+
+    def __init__(self, t0, dt, n):
+        self.t0 = t0
+        self.dt = dt
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def __repr__(self):
+        return 'TimeAxis(t0={}, dt={}, n={})'.format(self.t0, self.dt, self.n)
+
+    @property
+    def shape(self):
+        """Shape of time sequence."""
+        return (self.n,)
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            if not -self.n <= i < self.n:
+                raise IndexError("index {} is out of bounds".format(i))
+            return (i % self.n) * self.dt + self.t0
+        if isinstance(i, slice):
+            return np.arange(*i.indices(self.n)) * self.dt + self.t0
+        i = np.asarray(i)
+        if i.dtype == bool:
+            i = np.flatnonzero(i)
+        return np.where(i < 0, i + self.n, i) * self.dt + self.t0
+
+    def __array__(self, dtype=None, copy=None):
+        return self[:].astype(dtype, copy=False) if dtype else self[:]
+
+    def searchsorted(self, v, side='left', sorter=None):
+        """Return indices where values should be inserted to maintain
+        order (see numpy.searchsorted).
+
+        Parameters
+        ----------
+        v : array_like
+            Values.
+        side : str
+            'left' or 'right'.
+        sorter : array_like
+            Accepted for compatibility with numpy.searchsorted, which
+            passes it to this method. The time sequence is always
+            sorted, so it is ignored.
+
+        Returns
+        -------
+        : int or numpy.ndarray
+            Indices.
+        """
+        v = np.asarray(v, dtype=float)
+        with np.errstate(invalid='ignore'):
+            ind = np.ceil((v - self.t0) / self.dt)
+        ind = np.clip(np.nan_to_num(ind), 0, self.n).astype(np.int64)
+        # fix rounding errors, the inequalities are the same as in
+        # numpy.searchsorted
+        if side == 'left':
+            def before(i):
+                return i * self.dt + self.t0 < v
+        else:
+            def before(i):
+                return i * self.dt + self.t0 <= v
+        while True:
+            dec = (ind > 0) & ~before(ind - 1)
+            inc = (ind < self.n) & before(ind)
+            if not dec.any() and not inc.any():
+                return ind
+            ind = ind - dec + inc
+
+
+def load(path, dt, t0=0, dtype=None, channels=None, offset=0):
+    """Return memory-mapped recording and its time sequence.
+
+    Parameters
+    ----------
+    path : str
+        Path to .npy file or to raw binary file.
+    dt : float
+        Sampling period.
+    t0 : float
+        Time of the first sample.
+    dtype : numpy.dtype
+        Type of samples in raw binary file. Default is float64.
+    channels : int
+        Number of channels interleaved in raw binary file. If None,
+        there is one channel.
+    offset : int
+        Size of header of raw binary file (in bytes).
+
+    Returns
+    -------
+    : TimeAxis
+        Time sequence.
+    : numpy.ndarray
+        Samples (samples) or (channels, samples) backed by the file.
+    """
+    if path.endswith('.npy'):
+        x = np.load(path, mmap_mode='r')
+    else:
+        x = np.memmap(path, dtype=dtype or np.float64, mode='r',
+                      offset=offset)
+        if channels:
+            x = x[:len(x) - len(x) % channels].reshape(-1, channels).T
+    return TimeAxis(t0, dt, x.shape[-1]), x
@@ -45,11 +45,18 @@ setup(
 
     packages=['egegsignals'],
 
+    entry_points={
+        'console_scripts': [
+            'egegsignals-batch = egegsignals.batch:main',
+        ],
+    },
+
+    python_requires='>=3.7',
+
     install_requires=[
         'numpy>=1.14.0',
-        'scipy>=1.0.0',
+        'scipy>=1.4',
         'nose>=1.3.7',
-        'dsplab>=0.33.0',
     ],
 
     classifiers=[
@@ -0,0 +1,109 @@
+# egegsignals - Software for processing electrogastroenterography signals.
+
+# Copyright (C) 2013 -- 2018 Aleksandr Popov
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for batch processing."""
+
+import sys
+import os
+import csv
+import json
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.abspath('.'))
+from egegsignals import batch
+
+
+class TestBatch(unittest.TestCase):
+    """Tests for processing of directories of recordings."""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, 'results.csv')
+        rand = np.random.RandomState(0)
+        for i in range(3):
+            xdata = rand.normal(size=7200)
+            np.save(os.path.join(self.directory, 'rec{}.npy'.format(i)),
+                    xdata)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self):
+        """Read rows of results."""
+        with open(self.output, newline='') as f:
+            return list(csv.DictReader(f))
+
+    def test_run(self):
+        """One row per recording is written."""
+        count = batch.run(self.directory, self.output, 0.5, workers=2,
+                          chunksize=2)
+        self.assertEqual(count, 3)
+        rows = self.read()
+        self.assertEqual(sorted(row['recording'] for row in rows),
+                         ['rec0.npy', 'rec1.npy', 'rec2.npy'])
+        self.assertEqual(list(rows[0].keys()), batch.columns)
+
+    def test_resume(self):
+        """Recordings having results are skipped."""
+        batch.run(self.directory, self.output, 0.5, workers=1)
+        np.save(os.path.join(self.directory, 'rec3.npy'), np.zeros(7200))
+        count = batch.run(self.directory, self.output, 0.5, workers=1)
+        self.assertEqual(count, 1)
+        self.assertEqual(len(self.read()), 4)
+
+    def test_resume_empty_output(self):
+        """Header is written to empty file left by killed run."""
+        open(self.output, 'w').close()
+        batch.run(self.directory, self.output, 0.5, workers=1)
+        os.remove(os.path.join(self.directory, 'rec0.npy'))
+        np.save(os.path.join(self.directory, 'rec3.npy'), np.zeros(7200))
+        count = batch.run(self.directory, self.output, 0.5, workers=1)
+        self.assertEqual(count, 1)
+        self.assertEqual(len(self.read()), 4)
+
+    def test_resume_truncated_row(self):
+        """Row which was not written to the end is calculated again."""
+        batch.run(self.directory, self.output, 0.5, workers=1)
+        with open(self.output, 'rb+') as f:
+            f.truncate(os.path.getsize(self.output) - 10)
+        count = batch.run(self.directory, self.output, 0.5, workers=1)
+        self.assertEqual(count, 1)
+        rows = self.read()
+        self.assertEqual(sorted(row['recording'] for row in rows),
+                         ['rec0.npy', 'rec1.npy', 'rec2.npy'])
+
+    def test_profile(self):
+        """Statistics of stages are aggregated over recordings."""
+        profile = os.path.join(self.directory, 'profile.json')
+        batch.run(self.directory, self.output, 0.5, workers=2, profile=profile)
+        with open(profile) as f:
+            stats = json.load(f)
+        self.assertEqual(stats['hfart.hfa']['calls'], 3)
+        self.assertEqual(stats['hfart.hfa']['size'], 3*7200)
+
+    def test_main(self):
+        """Console script."""
+        code = batch.main([self.directory, '-o', self.output, '--dt', '0.5',
+                           '-j', '1'])
+        self.assertEqual(code, 0)
+        self.assertEqual(len(self.read()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
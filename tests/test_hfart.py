@@ -15,6 +15,446 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+"""Tests for hfart."""
+
 import sys
 import os
+import unittest
+import numpy as np
+from scipy.signal import firwin
+from scipy.signal.windows import hann
+
 sys.path.insert(0, os.path.abspath('.'))
+from egegsignals import hfart
+
+
+def noise(length, sampling_period, seed=0):
+    """Generate time sequence and normal noise."""
+    tdata = np.arange(0, length, sampling_period)
+    xdata = np.random.RandomState(seed).normal(size=len(tdata))
+    return tdata, xdata
+
+
+def three_sigma_loop(t, x, aver=60*10, step=30):
+    """Step by step calculation of 3 * sigma zone."""
+    s = x.copy()
+    bcalc = 0
+    ecalc = aver
+    bfill = 0
+    efill = aver/2
+    while ecalc <= t[-1] + step:
+        ind_s = (t >= bfill) & (t < efill)
+        ind_x = (t >= bcalc) & (t < ecalc)
+        s[ind_s] = 3 * np.std(x[ind_x])
+        bcalc += step
+        ecalc += step
+        bfill = efill
+        efill += step
+    s[t >= bfill] = 3 * np.std(x[t >= bcalc])
+    return s
+
+
+class TestThreeSigma(unittest.TestCase):
+    """Tests for 3 * sigma zone."""
+    def test_same_as_loop(self):
+        """Zone is the same as calculated step by step."""
+        tdata, xdata = noise(3600, 0.1)
+        xdata[1000:2000] *= 10
+        expected = three_sigma_loop(tdata, xdata)
+        self.assertTrue(np.allclose(hfart.three_sigma(tdata, xdata),
+                                    expected))
+
+    def test_fractional_step(self):
+        """Zone is the same as calculated step by step for fractional
+        intervals."""
+        tdata, xdata = noise(1000, 0.3)
+        expected = three_sigma_loop(tdata, xdata, aver=100.5, step=7.3)
+        self.assertTrue(np.allclose(
+            hfart.three_sigma(tdata, xdata, aver=100.5, step=7.3),
+            expected))
+
+    def test_short_signal(self):
+        """Zone of signal shorter than averaging interval."""
+        tdata, xdata = noise(300, 0.5)
+        self.assertTrue(np.allclose(hfart.three_sigma(tdata, xdata),
+                                    3 * np.std(xdata)))
+
+    def test_signal_not_changed(self):
+        """Signal is not changed."""
+        tdata, xdata = noise(1200, 0.5)
+        xcopy = xdata.copy()
+        hfart.three_sigma(tdata, xdata)
+        self.assertTrue(np.array_equal(xdata, xcopy))
+
+
+class TestOutliers(unittest.TestCase):
+    """Tests for outliers."""
+    def setUp(self):
+        self.tdata, self.xdata = noise(3600, 0.1)
+        self.xdata[[100, 5000, 20000]] = [10, -10, 12]
+
+    def test_same_as_loop(self):
+        """Outliers are the same as found sample by sample."""
+        m = np.mean(self.xdata)
+        s = hfart.three_sigma(self.tdata, self.xdata)
+        expected = [ti for ti, xi, si in zip(self.tdata, self.xdata, s)
+                    if (xi < m - si) | (xi > m + si)]
+        ot = hfart.outliers(self.tdata, self.xdata)
+        self.assertTrue(np.array_equal(ot, expected))
+
+    def test_indices(self):
+        """Indices of outliers can be returned."""
+        ot, ind = hfart.outliers(self.tdata, self.xdata, return_indices=True)
+        self.assertTrue(np.array_equal(self.tdata[ind], ot))
+        for i in [100, 5000, 20000]:
+            self.assertIn(i, ind)
+
+
+def hfa_filter_tapered(t, x, l=60, cutoff=0.3):
+    """Filtrate signal for HFA tapering the copy of signal."""
+    dt = t[1] - t[0]
+    h = hann(int(round(2*l/dt)))
+    x = np.array(x, dtype=float)
+    x[t < l] *= h[0:len(h)//2]
+    x[t > (t[-1]-l)] *= h[len(h)//2:]
+    taps = firwin(int(round(l/dt)) + 1, cutoff, pass_zero=False, fs=1/dt)
+    return np.convolve(x, taps, mode='same')
+
+
+class TestHFAFilter(unittest.TestCase):
+    """Tests for filtration for HFA."""
+    def setUp(self):
+        self.tdata, self.xdata = noise(3600, 0.5)
+        self.xdata += 10
+
+    def test_same_as_tapered(self):
+        """Filtered signal is the same as for tapered signal."""
+        expected = hfa_filter_tapered(self.tdata, self.xdata)
+        for method in ['auto', 'direct', 'fft', 'overlap-add']:
+            _, xf = hfart.hfa_filter(self.tdata, self.xdata, method=method)
+            self.assertTrue(np.allclose(xf, expected))
+
+    def test_signal_not_changed(self):
+        """Signal is not changed."""
+        xcopy = self.xdata.copy()
+        hfart.hfa_filter(self.tdata, self.xdata)
+        self.assertTrue(np.array_equal(self.xdata, xcopy))
+
+    def test_short_signals(self):
+        """Signals shorter than the tapered ends are filtered the same
+        way as coming by chunks."""
+        # shorter than l, between l and 2 * l, shorter than filter
+        for length in [30, 90, 20]:
+            tdata, xdata = noise(length, 0.5 if length > 20 else 0.1)
+            _, xf = hfart.hfa_filter(tdata, xdata)
+            dt = tdata[1] - tdata[0]
+            expected = np.concatenate(list(hfart._filter_stream(
+                [xdata], dt, len(xdata))))
+            self.assertEqual(xf.shape, xdata.shape)
+            self.assertTrue(np.allclose(xf, expected))
+
+    def test_unknown_method(self):
+        """Unknown method of convolution."""
+        with self.assertRaises(ValueError):
+            hfart.hfa_filter(self.tdata, self.xdata, method='unknown')
+
+
+class TestHFA(unittest.TestCase):
+    """Tests for HFA procedure."""
+    def test_spikes(self):
+        """Spikes are found."""
+        tdata, xdata = noise(3600, 0.1)
+        xdata[[10000, 20000]] = 100
+        at, _ = hfart.hfa(tdata, xdata)
+        self.assertIn(tdata[10000], at)
+        self.assertIn(tdata[20000], at)
+
+
+class TestHFAChannels(unittest.TestCase):
+    """Tests for HFA procedure for several channels."""
+    def setUp(self):
+        self.tdata = np.arange(0, 3600, 0.1)
+        rand = np.random.RandomState(0)
+        self.xdata = rand.normal(size=(4, len(self.tdata)))
+        for x_i in self.xdata:
+            x_i[rand.randint(0, len(self.tdata), 10)] += 8
+
+    def test_three_sigma(self):
+        """3 * sigma zones of channels are calculated independently."""
+        s = hfart.three_sigma(self.tdata, self.xdata)
+        for x_i, s_i in zip(self.xdata, s):
+            self.assertTrue(np.allclose(s_i,
+                                        hfart.three_sigma(self.tdata, x_i)))
+
+    def test_hfa_filter(self):
+        """Channels are filtered independently."""
+        for method in ['direct', 'overlap-add']:
+            _, xf = hfart.hfa_filter(self.tdata, self.xdata, method=method)
+            for x_i, xf_i in zip(self.xdata, xf):
+                self.assertTrue(np.allclose(
+                    xf_i, hfart.hfa_filter(self.tdata, x_i)[1]))
+
+    def test_hfa_channels(self):
+        """Artifacts of channels are found and merged."""
+        ats, at, _ = hfart.hfa_channels(self.tdata, self.xdata)
+        self.assertEqual(len(ats), 4)
+        for x_i, at_i in zip(self.xdata, ats):
+            self.assertTrue(np.array_equal(at_i,
+                                           hfart.hfa(self.tdata, x_i)[0]))
+        self.assertTrue(np.array_equal(at, np.unique(np.concatenate(ats))))
+
+
+class TestHFAStream(unittest.TestCase):
+    """Tests for HFA procedure for signal coming by chunks."""
+    def setUp(self):
+        self.tdata, self.xdata = noise(3600, 0.1)
+        self.xdata[np.random.RandomState(1).randint(0, 36000, 20)] += 8
+        self.expected, self.xf = hfart.hfa(self.tdata, self.xdata)
+
+    def chunks(self, size):
+        """Return function returning iterator over chunks."""
+        def chunks():
+            for i in range(0, len(self.xdata), size):
+                yield self.xdata[i:i + size]
+        return chunks
+
+    def test_same_as_hfa(self):
+        """Artifacts are the same as found in the whole signal."""
+        for size in [7, 1000, 5000, 36000]:
+            at = np.concatenate(list(hfart.hfa_stream(
+                self.chunks(size), 0.1, len(self.xdata))))
+            self.assertEqual(len(at), len(self.expected))
+            self.assertTrue(np.allclose(at, self.expected))
+
+    def test_mean(self):
+        """One pass is done if the mean of filtered signal is given."""
+        calls = []
+        chunks = self.chunks(1000)
+
+        def counted():
+            calls.append(1)
+            return chunks()
+        at = np.concatenate(list(hfart.hfa_stream(
+            counted, 0.1, len(self.xdata), mean=np.mean(self.xf))))
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(np.allclose(at, self.expected))
+
+    def test_wrong_length(self):
+        """Number of samples must be known."""
+        with self.assertRaises(ValueError):
+            list(hfart.hfa_stream(self.chunks(1000), 0.1, 40000))
+
+
+def longest_fragment_list(t, at, n=0):
+    """Select longest fragment of signal with n artifacts using
+    lists."""
+    atl = [t[0]] + list(at) + [t[-1]]
+    dt = t[1]-t[0]
+    df = [j-i for i, j in zip(atl[:-(n+1)], atl[(n+1):])]
+    atln = atl[np.argmax(df)]
+    return (atln+dt, atln+max(df)-dt)
+
+
+class TestFragments(unittest.TestCase):
+    """Tests for longest fragments and quality."""
+    def setUp(self):
+        self.tdata = np.arange(0, 3600, 0.5)
+        self.at = np.sort(np.random.RandomState(0).choice(self.tdata, 30,
+                                                          replace=False))
+
+    def test_same_as_lists(self):
+        """Longest fragment is the same as found using lists."""
+        for n in [0, 1, 5, 30]:
+            self.assertEqual(hfart.longest_fragment(self.tdata, self.at, n),
+                             longest_fragment_list(self.tdata, self.at, n))
+
+    def test_no_artifacts(self):
+        """Quality of signal without artifacts."""
+        value = hfart.quality(self.tdata, np.array([]))
+        self.assertAlmostEqual(value, 1 - 1/3600)
+
+    def test_quality_curve(self):
+        """Quality curve consists of qualities for all numbers of
+        artifacts."""
+        curve = hfart.quality_curve(self.tdata, self.at)
+        self.assertEqual(len(curve), 31)
+        for n, value in enumerate(curve):
+            self.assertEqual(value, hfart.quality(self.tdata, self.at, n))
+        self.assertTrue(np.all(np.diff(curve) >= 0))
+
+    def test_quality_curve_ns(self):
+        """Quality curve for given numbers of artifacts."""
+        curve = hfart.quality_curve(self.tdata, self.at, [2, 0, 100])
+        self.assertEqual(curve[0], hfart.quality(self.tdata, self.at, 2))
+        self.assertEqual(curve[1], hfart.quality(self.tdata, self.at, 0))
+        self.assertEqual(curve[2], hfart.quality(self.tdata, self.at, 30))
+
+
+def best_fragment_slices(t, at, ln, n=0):
+    """Select the best fragment slicing the signal for every candidate
+    fragment."""
+    starts = np.array([t[0]] + list(at[t[-1]-at >= ln]) +
+                      list(t[t == t[-1] - ln]))
+    aq = []
+    for i in starts:
+        ti = t[(t >= i) & (t < i+ln)]
+        start, stop = longest_fragment_list(ti, at[(at >= i) & (at < i+ln)],
+                                            n)
+        dt = ti[1] - ti[0]
+        aq.append((stop - start + dt) / (ti[-1] - ti[0] + dt))
+    start = starts[np.argmax(aq)]
+    return (start, start+ln)
+
+
+class TestBestFragment(unittest.TestCase):
+    """Tests for selection of the best fragment."""
+    def setUp(self):
+        self.tdata = np.arange(0, 3600, 0.5)
+        self.at = np.sort(np.random.RandomState(0).choice(self.tdata, 60,
+                                                          replace=False))
+
+    def test_same_as_slices(self):
+        """The best fragment is the same as found by slicing."""
+        for n in [0, 1]:
+            for ln in [60, 300, 1000]:
+                self.assertEqual(
+                    hfart.best_fragment(self.tdata, self.at, ln, n=n),
+                    best_fragment_slices(self.tdata, self.at, ln, n))
+
+    def test_several_lengths(self):
+        """The best fragments for several lengths."""
+        fragments = hfart.best_fragment(self.tdata, self.at, [60, 300])
+        self.assertEqual(fragments,
+                         [best_fragment_slices(self.tdata, self.at, 60),
+                          best_fragment_slices(self.tdata, self.at, 300)])
+
+    def test_percents(self):
+        """Length of fragment in percents."""
+        fragment = hfart.best_fragment(self.tdata, self.at, 10,
+                                       percents=True)
+        self.assertAlmostEqual(fragment[1] - fragment[0],
+                               self.tdata[-1] / 10)
+
+    def test_no_artifacts(self):
+        """The best fragment of signal without artifacts is at the
+        beginning."""
+        fragment = hfart.best_fragment(self.tdata, np.array([]), 300)
+        self.assertEqual(fragment, (0, 300))
+
+
+class TestMergeArtifacts(unittest.TestCase):
+    """Tests for merging of artifacts."""
+    def test_two_groups(self):
+        """Artifacts of two groups are merged."""
+        at = hfart.merge_artifacts(np.array([1, 5, 7]), np.array([2, 5, 9]))
+        self.assertEqual(list(at), [1, 2, 5, 7, 9])
+
+    def test_many_groups(self):
+        """Artifacts of many groups are merged."""
+        rand = np.random.RandomState(0)
+        ats = [np.sort(rand.choice(1000, 50, replace=False)) * 0.5
+               for i in range(8)]
+        at = hfart.merge_artifacts(*ats)
+        self.assertTrue(np.array_equal(at, np.unique(np.concatenate(ats))))
+
+    def test_tolerance(self):
+        """Close artifacts from different groups are merged into the
+        first of them."""
+        at = hfart.merge_artifacts(np.array([1.0, 5.0]),
+                                   np.array([1.1, 3.0, 4.95]),
+                                   np.array([3.05]), tol=0.2)
+        self.assertEqual(list(at), [1.0, 3.0, 4.95])
+
+    def test_tolerance_same_group(self):
+        """Close artifacts of one group are not merged and skipped
+        artifacts do not hide others."""
+        at = hfart.merge_artifacts(np.array([0, 0.5]), np.array([10]),
+                                   tol=1)
+        self.assertEqual(list(at), [0, 0.5, 10])
+        at = hfart.merge_artifacts(np.array([0]), np.array([0.8, 1.6]),
+                                   tol=1)
+        self.assertEqual(list(at), [0, 1.6])
+
+    def test_order_of_groups(self):
+        """Result does not depend on the order of groups."""
+        rand = np.random.RandomState(0)
+        # times on the grid, so groups share artifacts
+        ats = [np.sort(rand.choice(1000, 100, replace=False)) * 0.1
+               for i in range(5)]
+        for tol in [0, 0.5, 2]:
+            expected = hfart.merge_artifacts(*ats, tol=tol)
+            for perm in [[4, 3, 2, 1, 0], [2, 0, 4, 1, 3]]:
+                at = hfart.merge_artifacts(*[ats[i] for i in perm], tol=tol)
+                self.assertTrue(np.array_equal(at, expected))
+
+    def test_same_times_tolerance(self):
+        """Artifact located at the same time in several groups belongs
+        to all of them."""
+        for ats in [([10.0], [0.0, 0.3], [0.0]), ([10.0], [0.0], [0.0, 0.3])]:
+            at = hfart.merge_artifacts(*ats, tol=0.5)
+            self.assertEqual(list(at), [0, 10])
+
+    def test_repeated(self):
+        """Repeated artifacts of the 2'nd group are skipped as it was
+        done by the step by step merging."""
+        at = hfart.merge_artifacts(np.array([1, 2, 3]), np.array([5, 5, 6]))
+        self.assertEqual(list(at), [1, 2, 3, 5, 6])
+
+    def test_repeated_first_group(self):
+        """Repeated artifacts of the 1'st group are kept whatever the
+        other groups are."""
+        at = hfart.merge_artifacts(np.array([5, 5]), np.array([1]))
+        self.assertEqual(list(at), [1, 5, 5])
+        at = hfart.merge_artifacts(np.array([1]), np.array([5, 5]))
+        self.assertEqual(list(at), [1, 5])
+        at = hfart.merge_artifacts(np.array([5, 5]), np.array([5]),
+                                   np.array([5, 6]), tol=0.5)
+        self.assertEqual(list(at), [5, 5, 6])
+
+    def test_same_artifacts(self):
+        """Artifacts found at the same times in all groups are merged
+        without tolerance."""
+        rand = np.random.RandomState(0)
+        at = np.sort(rand.choice(1000, 50, replace=False)) * 0.5
+        merged = hfart.merge_artifacts(*[at] * 8)
+        self.assertTrue(np.array_equal(merged, at))
+
+    def test_no_groups(self):
+        """Nothing to merge."""
+        self.assertEqual(len(hfart.merge_artifacts()), 0)
+        self.assertEqual(len(hfart.merge_artifacts(np.array([]),
+                                                   np.array([]))), 0)
+
+
+class TestFloat32(unittest.TestCase):
+    """Tests for calculations in float32."""
+    def setUp(self):
+        self.tdata, xdata = noise(3600, 0.1)
+        xdata[::5000] += 20
+        self.xdata = xdata.astype(np.float32)
+
+    def test_three_sigma(self):
+        """Zone is float32 and close to float64 one."""
+        sigma = hfart.three_sigma(self.tdata, self.xdata, dtype=np.float32)
+        self.assertEqual(sigma.dtype, np.float32)
+        self.assertTrue(np.allclose(
+            sigma, hfart.three_sigma(self.tdata, self.xdata), rtol=1e-5))
+
+    def test_hfa(self):
+        """Filtered signal is float32 and artifacts are the same."""
+        at, xf = hfart.hfa(self.tdata, self.xdata, dtype=np.float32)
+        expected_at, expected_xf = hfart.hfa(self.tdata, self.xdata)
+        self.assertEqual(xf.dtype, np.float32)
+        self.assertEqual(expected_xf.dtype, np.float64)
+        self.assertTrue(np.allclose(xf, expected_xf, rtol=1e-5, atol=1e-5))
+        self.assertTrue(np.array_equal(at, expected_at))
+
+    def test_int16(self):
+        """Integer samples are converted to float32."""
+        xdata = (self.xdata * 100).astype(np.int16)
+        _, xf = hfart.hfa_filter(self.tdata, xdata, dtype=np.float32)
+        self.assertEqual(xf.dtype, np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main()
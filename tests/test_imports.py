@@ -0,0 +1,66 @@
+# egegsignals - Software for processing electrogastroenterography signals.
+
+# Copyright (C) 2013 -- 2018 Aleksandr Popov
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for time of import of modules."""
+
+import sys
+import os
+import json
+import subprocess
+import unittest
+
+sys.path.insert(0, os.path.abspath('.'))
+
+
+# maximal time of import of modules in new process (sec), numpy takes
+# about 0.1 sec
+MAX_IMPORT_TIME = 1.0
+
+
+def import_in_process(code):
+    """Run code in new process and return its JSON output."""
+    out = subprocess.check_output([sys.executable, '-c', code],
+                                  cwd=os.path.abspath('.'))
+    return json.loads(out)
+
+
+class TestImports(unittest.TestCase):
+    """Tests for lazy imports of heavy dependencies."""
+    def test_scipy_not_imported(self):
+        """scipy is imported on first use only."""
+        res = import_in_process(
+            "import json, sys\n"
+            "import numpy as np\n"
+            "from egegsignals import hfart, parameters\n"
+            "before = 'scipy' in sys.modules\n"
+            "t = np.arange(1000) * 0.5\n"
+            "hfart.hfa_filter(t, np.ones(1000))\n"
+            "print(json.dumps([before, 'scipy.signal' in sys.modules]))\n")
+        self.assertEqual(res, [False, True])
+
+    def test_import_time(self):
+        """Modules are imported fast."""
+        elapsed = import_in_process(
+            "import json, time\n"
+            "start = time.perf_counter()\n"
+            "from egegsignals import hfart, parameters\n"
+            "print(json.dumps(time.perf_counter() - start))\n")
+        self.assertLess(elapsed, MAX_IMPORT_TIME)
+
+
+if __name__ == '__main__':
+    unittest.main()
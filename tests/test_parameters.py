@@ -173,6 +173,15 @@ class TestRhythmicity(unittest.TestCase):
                                sampling_period, par.egeg_fs['stomach'])
         self.assertLess(val1, val2)
 
+    def test_rhythmicity_wrap(self):
+        """Gastroscan-GEM envelope includes the difference between the
+        last and the first values in band."""
+        spectrum = np.array([1, 3, 2, 4, 0, 0, 0, 0])
+        val = par.rhythmicity(spectrum, 1, (0, 0.5))
+        self.assertEqual(val, (2 + 1 + 2 + 3) / 4)
+        val = par.rhythmicity(spectrum, 1, (0, 0.5), wrap=False)
+        self.assertEqual(val, (2 + 1 + 2) / 4)
+
 
 class TestRhythmicityNorm(unittest.TestCase):
     """Test suit for energy."""
@@ -220,6 +229,389 @@ class TestDFIC(unittest.TestCase):
                          nseg=1200, nstep=120)
         self.assertLess(0.3, value)
 
+    def test_dfic_return_dfs(self):
+        """Dominant frequencies of segments can be returned."""
+        sampling_period = 0.5
+        xdata = harmonic(60*40, sampling_period, 0.05)
+        value, dfs = par.dfic(par.egeg_fs['stomach'], xdata, sampling_period,
+                              nseg=1200, nstep=120, return_dfs=True)
+        self.assertEqual(len(dfs), 31)
+        self.assertTrue(np.allclose(dfs, 0.05))
+        self.assertEqual(value, np.std(dfs) / np.average(dfs))
+
+
+class TestSTFT(unittest.TestCase):
+    """Tests for short-time Fourier transform."""
+    def test_shape(self):
+        """Number and length of spectra."""
+        xdata = harmonic(600, 0.5, 0.05)
+        spectra = par.stft(xdata, 0.5, nseg=200, nstep=50)
+        self.assertEqual(spectra.shape, (21, 200))
+        spectra = par.stft(xdata, 0.5, nseg=200, nstep=50, nfft=512)
+        self.assertEqual(spectra.shape, (21, 512))
+
+    def test_padded(self):
+        """Signal is padded to the length multiple of nseg."""
+        xdata = harmonic(600, 0.5, 0.05)
+        spectra = par.stft(xdata, 0.5, nseg=700, nstep=700, padded=True)
+        self.assertEqual(spectra.shape, (2, 700))
+
+    def test_one_side(self):
+        """One-side spectra are non-negative parts of two-side
+        ones."""
+        xdata = harmonic(600, 0.5, 0.05)
+        spectra = par.stft(xdata, 0.5, nseg=200, nstep=50)
+        spectra_1 = par.stft(xdata, 0.5, nseg=200, nstep=50, one_side=True)
+        self.assertEqual(spectra_1.shape, (21, 101))
+        self.assertTrue(np.allclose(spectra_1[:, :100], spectra[:, :100]))
+
+    def test_energy(self):
+        """Spectrum of segment has the same energy as segment."""
+        xdata = np.ones(100)
+        spectra = par.stft(xdata, 1, nseg=100, nstep=100, window='boxcar')
+        self.assertAlmostEqual(np.sum(spectra**2) / 100, 100)
+
+    def test_window(self):
+        """Window is used."""
+        xdata = harmonic(600, 0.5, 0.05)
+        spectra_1 = par.stft(xdata, 0.5, nseg=200, nstep=50)
+        spectra_2 = par.stft(xdata, 0.5, nseg=200, nstep=50,
+                             window='boxcar')
+        self.assertFalse(np.allclose(spectra_1, spectra_2))
+        spectra_3 = par.stft(xdata, 0.5, nseg=200, nstep=50,
+                             window=np.ones(200))
+        self.assertTrue(np.allclose(spectra_2, spectra_3))
+
+
+class TestBandParameters(unittest.TestCase):
+    """Tests for calculation of all parameters in several bands."""
+    def test_same_as_functions(self):
+        """Parameters are the same as calculated one by one."""
+        sampling_period = 0.5
+        xdata = harmonic(600, sampling_period, 0.05) + \
+            harmonic(600, sampling_period, 0.15, amp=0.5)
+        spectrum = abs(fft(xdata))
+        values = par.band_parameters(spectrum, sampling_period)
+        self.assertEqual(set(values.keys()), set(par.organ_names))
+        for organ, fs in par.egeg_fs.items():
+            for name in par.parameter_names:
+                expected = getattr(par, name)(spectrum, sampling_period, fs)
+                self.assertAlmostEqual(values[organ][name], expected)
+
+    def test_custom_bands(self):
+        """Any bands can be used."""
+        sampling_period = 0.5
+        xdata = np.array([1, 1, 1, 1, 1, 1, 1, 1, 1, 1])
+        values = par.band_parameters(abs(fft(xdata)), sampling_period,
+                                     {'all': (0, 1)})
+        self.assertEqual(values['all']['energy'], 5)
+
+
+class TestBatch(unittest.TestCase):
+    """Tests for parameters of several spectra."""
+    def setUp(self):
+        sampling_period = 0.5
+        self.sampling_period = sampling_period
+        self.spectra = np.array([
+            abs(fft(harmonic(600, sampling_period, freq, amp)))
+            for freq, amp in [(0.04, 1), (0.05, 2), (0.06, 3)]
+        ])
+
+    def test_same_as_one_by_one(self):
+        """Parameters of several spectra are the same as calculated
+        for every spectrum."""
+        fs = par.egeg_fs['stomach']
+        for name in par.parameter_names:
+            func = getattr(par, name)
+            values = func(self.spectra, self.sampling_period, fs)
+            self.assertEqual(values.shape, (3,))
+            for spectrum, value in zip(self.spectra, values):
+                expected = func(spectrum, self.sampling_period, fs)
+                self.assertAlmostEqual(value, expected)
+
+    def test_axis(self):
+        """Frequencies can be placed along any axis."""
+        fs = par.egeg_fs['stomach']
+        values = par.dominant_frequency(self.spectra.T, self.sampling_period,
+                                        fs, axis=0)
+        self.assertTrue(np.allclose(values, [0.04, 0.05, 0.06]))
+
+    def test_band_parameters(self):
+        """All parameters of several spectra calculated."""
+        values = par.band_parameters(self.spectra, self.sampling_period)
+        self.assertTrue(np.allclose(
+            values['stomach']['dominant_frequency'], [0.04, 0.05, 0.06]))
+
+
+class TestCache(unittest.TestCase):
+    """Tests for cache of frequency axes and bands."""
+    def setUp(self):
+        par.cache_clear()
+
+    def test_hits(self):
+        """The band is calculated once for the same length and
+        sampling period."""
+        spectrum = abs(fft(harmonic(600, 0.5, 0.05)))
+        par.dominant_frequency(spectrum, 0.5, par.egeg_fs['stomach'])
+        par.energy(spectrum, 0.5, par.egeg_fs['stomach'])
+        info = par.cache_info()
+        self.assertEqual(info['bands']['misses'], 1)
+        self.assertEqual(info['bands']['hits'], 1)
+
+    def test_clear(self):
+        """Cache can be cleared."""
+        spectrum = abs(fft(harmonic(600, 0.5, 0.05)))
+        par.energy(spectrum, 0.5, par.egeg_fs['stomach'])
+        par.cache_clear()
+        self.assertEqual(par.cache_info()['bands']['currsize'], 0)
+
+    def test_negative_band(self):
+        """Bands with negative frequencies are supported."""
+        xdata = np.array([1, 1, 1, 1, 1, 1, 1, 1, 1, 1])
+        val = par.energy(abs(fft(xdata)), 0.5, [-1, 1])
+        self.assertEqual(val, 5)
+
+
+class TestParametersSeries(unittest.TestCase):
+    """Tests for parameters of segments of signal."""
+    def test_same_as_loop(self):
+        """Values are the same as calculated for every segment."""
+        sampling_period = 0.5
+        xdata = harmonic(1200, sampling_period, 0.05) + \
+            np.random.RandomState(0).normal(size=2400)
+        values = par.parameters_series(xdata, sampling_period, 600, 150)
+        spectra = par.stft(xdata, sampling_period, 600, 150)
+        self.assertEqual(values.shape, (len(spectra), len(par.organ_names),
+                                        len(par.parameter_names)))
+        for spectrum, expected in zip(spectra, values):
+            params = par.band_parameters(spectrum, sampling_period)
+            for i, organ in enumerate(par.organ_names):
+                for j, name in enumerate(par.parameter_names):
+                    self.assertAlmostEqual(params[organ][name],
+                                           expected[i, j])
+
+    def test_organs(self):
+        """Only given organs are calculated."""
+        xdata = harmonic(1200, 0.5, 0.05)
+        values = par.parameters_series(xdata, 0.5, 600, 600,
+                                       organs=['stomach'])
+        self.assertEqual(values.shape, (4, 1, len(par.parameter_names)))
+        self.assertTrue(np.allclose(values[:, 0, 0], 0.05))
+
+
+class TestWelch(unittest.TestCase):
+    """Tests for parameters of spectrum averaged by Welch's method."""
+    def setUp(self):
+        self.sampling_period = 0.5
+        self.xdata = harmonic(1200, self.sampling_period, 0.05) + \
+            np.random.RandomState(0).normal(size=2400)
+
+    def test_average_of_segments(self):
+        """Squared spectrum is the average of squared spectra of
+        segments."""
+        spectrum = par.welch(self.xdata, self.sampling_period, 600, 150)
+        spectra = par.stft(self.xdata, self.sampling_period, 600, 150,
+                           one_side=True)
+        self.assertTrue(np.allclose(spectrum**2, np.mean(spectra**2, axis=0)))
+
+    def test_batch(self):
+        """Spectrum does not depend on number of segments transformed
+        at once."""
+        expected = par.welch(self.xdata, self.sampling_period, 600, 150,
+                             nfft=1024)
+        for batch in [1, 4, 100]:
+            self.assertTrue(np.allclose(
+                par.welch(self.xdata, self.sampling_period, 600, 150,
+                          nfft=1024, batch=batch),
+                expected))
+
+    def test_parameters(self):
+        """Energy is the average of energies of segments."""
+        values = par.welch_parameters(self.xdata, self.sampling_period, 600)
+        series = par.parameters_series(self.xdata, self.sampling_period, 600)
+        energy = par.parameter_names.index('energy')
+        for i, organ in enumerate(par.organ_names):
+            self.assertAlmostEqual(values[organ]['energy'],
+                                   np.mean(series[:, i, energy]))
+        self.assertAlmostEqual(values['stomach']['dominant_frequency'], 0.05)
+
+    def test_short_signal(self):
+        """Signal must contain at least one segment."""
+        with self.assertRaises(ValueError):
+            par.welch(self.xdata[:100], self.sampling_period, 600)
+
+
+class TestOnlineDFIC(unittest.TestCase):
+    """Tests for dominant frequency instability coefficient of signal
+    coming by chunks."""
+    def test_same_as_dfic(self):
+        """Coefficient is the same as for the whole signal received."""
+        sampling_period = 0.25
+        xdata = np.array([random.randint(-1000, 1000) for i in range(4800)])
+        online = par.OnlineDFIC((0, 2), sampling_period, nseg=1200,
+                                nstep=120)
+        received = 0
+        dfs = []
+        for size in [100, 1000, 50, 2000, 1, 1649]:
+            dfs.extend(online.update(xdata[received:received + size]))
+            received += size
+            if received < 1200:
+                continue
+            value, expected = par.dfic((0, 2), xdata[:received],
+                                       sampling_period, nseg=1200, nstep=120,
+                                       return_dfs=True)
+            self.assertEqual(online.count, len(expected))
+            self.assertTrue(np.allclose(dfs, expected))
+            self.assertAlmostEqual(online.value, value)
+
+    def test_no_segments(self):
+        """Coefficient is nan while the first segment is not
+        received."""
+        online = par.OnlineDFIC(par.egeg_fs['stomach'], 0.5, nseg=1200,
+                                nstep=120)
+        self.assertEqual(len(online.update(np.zeros(1000))), 0)
+        self.assertTrue(np.isnan(online.value))
+
+    def test_long_step(self):
+        """Step can be longer than segment."""
+        sampling_period = 0.5
+        xdata = harmonic(60*40, sampling_period, 0.05)
+        online = par.OnlineDFIC(par.egeg_fs['stomach'], sampling_period,
+                                nseg=200, nstep=500)
+        dfs = online.update(xdata)
+        self.assertEqual(len(dfs), 10)
+        self.assertTrue(np.allclose(dfs, 0.05))
+
+
+class TestOneSide(unittest.TestCase):
+    """Tests for parameters of one-side spectra."""
+    def setUp(self):
+        self.sampling_period = 0.5
+        self.xdata = harmonic(600, self.sampling_period, 0.05) + \
+            np.random.RandomState(0).normal(size=1200)
+
+    def check(self, xdata):
+        """Check that parameters are the same as for two-side
+        spectrum."""
+        two = abs(np.fft.fft(xdata))
+        one = abs(np.fft.rfft(xdata))
+        for fs in par.egeg_fs.values():
+            for name in par.parameter_names:
+                func = getattr(par, name)
+                self.assertAlmostEqual(
+                    func(one, self.sampling_period, fs, one_side=True,
+                         n=len(xdata)),
+                    func(two, self.sampling_period, fs))
+
+    def test_even(self):
+        """Signal of even length."""
+        self.check(self.xdata)
+
+    def test_odd(self):
+        """Signal of odd length."""
+        self.check(self.xdata[:-1])
+
+    def test_band_parameters(self):
+        """All parameters of several one-side spectra."""
+        spectra = abs(np.fft.rfft([self.xdata, 2 * self.xdata]))
+        values = par.band_parameters(spectra, self.sampling_period,
+                                     one_side=True)
+        expected = par.band_parameters(abs(np.fft.fft(self.xdata)),
+                                       self.sampling_period)
+        self.assertAlmostEqual(values['stomach']['energy'][0],
+                               expected['stomach']['energy'])
+        self.assertAlmostEqual(values['stomach']['energy'][1],
+                               4 * expected['stomach']['energy'])
+
+    def test_errors(self):
+        """Negative bands and wrong number of samples are rejected."""
+        one = abs(np.fft.rfft(self.xdata))
+        with self.assertRaises(ValueError):
+            par.energy(one, self.sampling_period, (-1, 1), one_side=True)
+        with self.assertRaises(ValueError):
+            par.energy(one, self.sampling_period, (0, 1), one_side=True,
+                       n=len(self.xdata) + 2)
+
+
+class TestSpectrum(unittest.TestCase):
+    """Tests for spectrum object."""
+    def setUp(self):
+        self.sampling_period = 0.5
+        self.xdata = harmonic(600, self.sampling_period, 0.05) + \
+            harmonic(600, self.sampling_period, 0.15, amp=0.5)
+
+    def test_same_as_functions(self):
+        """Parameters are the same as calculated by functions."""
+        spectrum = par.Spectrum(abs(fft(self.xdata)), self.sampling_period)
+        expected = par.band_parameters(abs(fft(self.xdata)),
+                                       self.sampling_period)
+        for organ in par.organ_names:
+            for name in par.parameter_names:
+                self.assertAlmostEqual(spectrum.parameters(organ)[name],
+                                       expected[organ][name])
+
+    def test_one_side(self):
+        """One-side spectrum gives the same parameters."""
+        two = par.Spectrum.from_signal(self.xdata, self.sampling_period,
+                                       one_side=False)
+        one = par.Spectrum.from_signal(self.xdata[:-1], self.sampling_period)
+        one_even = par.Spectrum.from_signal(self.xdata, self.sampling_period)
+        self.assertEqual(one.n, len(self.xdata) - 1)
+        self.assertEqual(one_even.n, len(self.xdata))
+        for name in par.parameter_names:
+            self.assertAlmostEqual(one_even.parameters('nestis')[name],
+                                   two.parameters('nestis')[name])
+
+    def test_cached(self):
+        """Bands and parameters are calculated once."""
+        spectrum = par.Spectrum.from_signal(self.xdata, self.sampling_period)
+        self.assertIs(spectrum.parameters('stomach'),
+                      spectrum.parameters('stomach'))
+        self.assertIs(spectrum.band((0.03, 0.07))[1],
+                      spectrum.band('stomach')[1])
+        self.assertAlmostEqual(spectrum.parameters('stomach')
+                               ['dominant_frequency'], 0.05)
+
+    def test_inconsistent(self):
+        """Length of spectrum must match number of samples."""
+        with self.assertRaises(ValueError):
+            par.Spectrum(np.ones(301), 0.5, one_side=True, n=1200)
+
+
+class TestFloat32(unittest.TestCase):
+    """Tests for spectra in float32."""
+    def setUp(self):
+        self.sampling_period = 0.5
+        self.xdata = (harmonic(1200, self.sampling_period, 0.05) +
+                      np.random.RandomState(0).normal(size=2400))
+
+    def test_stft(self):
+        """Spectra are float32 and close to float64 ones."""
+        spectra = par.stft(self.xdata, self.sampling_period, 600, 60,
+                           one_side=True, dtype=np.float32)
+        expected = par.stft(self.xdata, self.sampling_period, 600, 60,
+                            one_side=True)
+        self.assertEqual(spectra.dtype, np.float32)
+        self.assertTrue(np.allclose(spectra, expected,
+                                    atol=1e-5 * expected.max()))
+
+    def test_dfic(self):
+        """Coefficient is close to float64 one."""
+        fs = par.egeg_fs['stomach']
+        self.assertAlmostEqual(
+            par.dfic(fs, self.xdata, self.sampling_period, 600, 60,
+                     dtype=np.float32),
+            par.dfic(fs, self.xdata, self.sampling_period, 600, 60))
+
+    def test_spectrum(self):
+        """Parameters of float32 spectrum."""
+        spectrum = par.Spectrum.from_signal(
+            (self.xdata * 100).astype(np.int16), self.sampling_period,
+            dtype=np.float32)
+        self.assertEqual(spectrum.magnitudes.dtype, np.float32)
+        self.assertAlmostEqual(
+            spectrum.parameters('stomach')['dominant_frequency'], 0.05)
+
 
 class TestNextOrgan(unittest.TestCase):
     """Tests for getting of next organ name."""
@@ -0,0 +1,123 @@
+# egegsignals - Software for processing electrogastroenterography signals.
+
+# Copyright (C) 2013 -- 2018 Aleksandr Popov
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for profiling of stages."""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.abspath('.'))
+from egegsignals import hfart
+from egegsignals import parameters as par
+from egegsignals import profiling
+
+
+class TestProfiler(unittest.TestCase):
+    """Tests for profiler."""
+    def setUp(self):
+        self.dt = 0.5
+        self.t = np.arange(7200) * self.dt
+        self.x = np.random.RandomState(0).normal(size=7200)
+
+    def test_stages(self):
+        """Stages of hfa are recorded with sizes of arrays."""
+        with profiling.Profiler() as prof:
+            hfart.hfa(self.t, self.x)
+            hfart.hfa(self.t[:3600], self.x[:3600])
+        stats = prof.stats()
+        for name in ['hfart.hfa', 'hfart.hfa_filter', 'hfart.outliers',
+                     'hfart.three_sigma']:
+            self.assertEqual(stats[name]['calls'], 2)
+            self.assertEqual(stats[name]['size'], 7200 + 3600)
+        self.assertGreaterEqual(stats['hfart.hfa']['time'],
+                                stats['hfart.hfa_filter']['time'])
+
+    def test_disabled(self):
+        """Nothing is recorded outside the context."""
+        with profiling.Profiler() as prof:
+            pass
+        hfart.hfa(self.t, self.x)
+        self.assertEqual(prof.stats(), {})
+
+    def test_callback(self):
+        """Callback is called after every stage."""
+        calls = []
+        with profiling.Profiler(lambda *args: calls.append(args)):
+            par.dfic(par.egeg_fs['stomach'], self.x, self.dt, 600, 60)
+        self.assertEqual([c[0] for c in calls],
+                         ['parameters.stft', 'parameters.dfic'])
+        self.assertEqual(calls[-1][2], 7200)
+
+    def test_nested(self):
+        """Inner profiler does not change outer one."""
+        with profiling.Profiler() as outer:
+            with profiling.Profiler() as inner:
+                hfart.three_sigma(self.t, self.x)
+            hfart.outliers(self.t, self.x)
+        self.assertEqual(set(inner.stats()), {'hfart.three_sigma'})
+        self.assertEqual(outer.stats()['hfart.three_sigma']['calls'], 1)
+
+    def test_threads(self):
+        """Stages of other threads are not recorded."""
+        def work():
+            with profiling.Profiler() as prof:
+                started.set()
+                finish.wait()
+            hfart.three_sigma(self.t, self.x)
+            results.append(prof.stats())
+        started = threading.Event()
+        finish = threading.Event()
+        results = []
+        thread = threading.Thread(target=work)
+        thread.start()
+        started.wait()
+        with profiling.Profiler() as prof:
+            finish.set()
+            thread.join()
+            hfart.outliers(self.t, self.x)
+        self.assertEqual(results, [{}])
+        self.assertEqual(prof.stats()['hfart.three_sigma']['calls'], 1)
+
+    def test_update(self):
+        """Statistics are merged."""
+        with profiling.Profiler() as first:
+            hfart.three_sigma(self.t, self.x)
+        with profiling.Profiler() as second:
+            hfart.three_sigma(self.t, self.x)
+        second.update(first.stats())
+        stats = second.stats()['hfart.three_sigma']
+        self.assertEqual(stats['calls'], 2)
+        self.assertEqual(stats['size'], 2*7200)
+
+    def test_to_json(self):
+        """Statistics are saved to file."""
+        with profiling.Profiler() as prof:
+            hfart.best_fragment(self.t, np.array([100, 2000]), 600)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.json')
+            prof.to_json(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f), prof.stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+# egegsignals - Software for processing electrogastroenterography signals.
+
+# Copyright (C) 2013 -- 2018 Aleksandr Popov
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests for recordings."""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.abspath('.'))
+from egegsignals import hfart
+from egegsignals import parameters as par
+from egegsignals.recordings import TimeAxis, load
+
+
+class StrictTimeAxis(TimeAxis):
+    """Time sequence which can not be converted to array."""
+    __slots__ = ()
+
+    def __array__(self, dtype=None, copy=None):
+        raise AssertionError("time sequence is converted to array")
+
+
+class TestTimeAxis(unittest.TestCase):
+    """Tests for time sequence calculated on demand."""
+    def setUp(self):
+        self.taxis = TimeAxis(2.5, 0.3, 1000)
+        self.tdata = np.arange(1000) * 0.3 + 2.5
+
+    def test_values(self):
+        """Values are the same as of materialized sequence."""
+        self.assertEqual(len(self.taxis), 1000)
+        self.assertEqual(self.taxis[0], self.tdata[0])
+        self.assertEqual(self.taxis[-1], self.tdata[-1])
+        self.assertTrue(np.array_equal(self.taxis[10:100:3],
+                                       self.tdata[10:100:3]))
+        self.assertTrue(np.array_equal(self.taxis[[1, 5, -1]],
+                                       self.tdata[[1, 5, -1]]))
+        self.assertTrue(np.array_equal(np.asarray(self.taxis), self.tdata))
+
+    def test_out_of_bounds(self):
+        """Index out of bounds."""
+        with self.assertRaises(IndexError):
+            self.taxis[1000]  # pylint: disable=pointless-statement
+
+    def test_searchsorted(self):
+        """Search is the same as in materialized sequence."""
+        values = np.concatenate((np.linspace(0, 310, 1001), self.tdata))
+        for side in ['left', 'right']:
+            self.assertTrue(np.array_equal(
+                self.taxis.searchsorted(values, side=side),
+                np.searchsorted(self.tdata, values, side=side)))
+
+    def test_hfa(self):
+        """HFA with time sequence calculated on demand."""
+        xdata = np.random.RandomState(0).normal(size=36000)
+        xdata[[1000, 20000]] = 10
+        tdata = np.arange(36000) * 0.1
+        at, _ = hfart.hfa(TimeAxis(0, 0.1, 36000), xdata)
+        self.assertTrue(np.array_equal(at, hfart.hfa(tdata, xdata)[0]))
+        self.assertEqual(hfart.best_fragment(TimeAxis(0, 0.1, 36000), at,
+                                             600),
+                         hfart.best_fragment(tdata, at, 600))
+
+    def test_not_materialized(self):
+        """Functions do not convert time sequence to array."""
+        taxis = StrictTimeAxis(0, 0.1, 36000)
+        at = np.array([100.5, 1200.3, 2500.0])
+        self.assertEqual(np.searchsorted(taxis, [0.05, 100]).tolist(),
+                         [1, 1000])
+        tdata = np.arange(36000) * 0.1
+        self.assertEqual(hfart.best_fragment(taxis, at, [600, 1800]),
+                         hfart.best_fragment(tdata, at, [600, 1800]))
+        hfart.quality(taxis, at)
+        hfart.quality_curve(taxis, at)
+        hfart.three_sigma(taxis, np.ones(36000))
+
+
+class TestLoad(unittest.TestCase):
+    """Tests for loading of recordings."""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.xdata = np.random.RandomState(0).normal(size=(2, 7200))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_npy(self):
+        """Recording in .npy file is memory-mapped."""
+        path = os.path.join(self.directory, 'rec.npy')
+        np.save(path, self.xdata[0])
+        tdata, xdata = load(path, 0.5)
+        self.assertIsInstance(xdata, np.memmap)
+        self.assertEqual(len(tdata), 7200)
+        self.assertEqual(tdata[-1], 7199 * 0.5)
+        self.assertTrue(np.array_equal(xdata, self.xdata[0]))
+
+    def test_raw(self):
+        """Raw binary file with interleaved channels."""
+        path = os.path.join(self.directory, 'rec.bin')
+        header = np.zeros(4, dtype=np.int32).tobytes()
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(self.xdata.T.astype(np.float32).tobytes())
+        _, xdata = load(path, 0.5, dtype=np.float32, channels=2, offset=16)
+        self.assertEqual(xdata.shape, (2, 7200))
+        self.assertTrue(np.allclose(xdata, self.xdata))
+
+    def test_dfic(self):
+        """Parameters of memory-mapped recording."""
+        path = os.path.join(self.directory, 'rec.npy')
+        np.save(path, self.xdata[0])
+        _, xdata = load(path, 0.5)
+        self.assertEqual(par.dfic((0, 1), xdata, 0.5, 1200, 120),
+                         par.dfic((0, 1), self.xdata[0], 0.5, 1200, 120))
+
+
+if __name__ == '__main__':
+    unittest.main()